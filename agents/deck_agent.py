@@ -4,11 +4,11 @@ Only the callback's return value is surfaced to the caller.
 """
 
 from crewai import Agent, Task, Crew
-from langchain_openai import ChatOpenAI
 
 from chains.pitch_deck_chain import run_pitch_deck_chain
+from core.llm_utils import get_chat_model
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2)
+llm = get_chat_model("gpt-3.5-turbo", 0.2)
 
 
 def build_deck_agent(pdf_path: str):
@@ -1,10 +1,10 @@
 from crewai import Agent, Task
-from langchain_openai import ChatOpenAI
 
+from core.llm_utils import get_chat_model
 from core.schemas import StartupProfile
 from chains.risk_assessment_chain import run_risk_assessment_chain
 
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2)
+llm = get_chat_model("gpt-3.5-turbo", 0.2)
 
 
 def build_risk_assessment_agent(profile: StartupProfile):
@@ -0,0 +1,125 @@
+"""
+Fused vs per-chain extraction benchmark.
+
+Runs the five extraction chains one after another, then the fused chain,
+against a stubbed LLM (fixed latency, canned JSON) and stubbed retrieval
+whose topics overlap the way real decks do. Reports round trips, prompt
+tokens and wall time per mode.
+
+    python -m benchmarks.fused_vs_chains [--latency 0.5] [--decks 3]
+"""
+
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("LLM_CACHE_BYPASS", "1")
+os.environ.setdefault("LLM_RATE_LIMIT_DISABLED", "1")
+os.environ.setdefault("CONTEXT_CACHE_DISABLED", "1")
+
+from langchain.schema import AIMessage  # noqa: E402
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+import core.hybrid_context  # noqa: E402
+import core.vector_store  # noqa: E402
+from chains import fused_extraction_chain  # noqa: E402
+from chains.fused_extraction_chain import FUSED_CHAINS  # noqa: E402
+from core.llm_utils import _messages  # noqa: E402
+from core.schemas import StartupProfile  # noqa: E402
+from core.tokens import count_message_tokens  # noqa: E402
+
+FUSED_ANSWER = {
+    "tech_maturity": "beta",
+    "moat_strength": "proprietary dataset",
+    "founder_fit_score": 0.8,
+    "prior_exits": 1,
+    "TAM": 1000,
+    "SAM": 200,
+    "SOM": 20,
+    "cash_burn_12m": 3,
+    "runway_months": 18,
+    "implied_valuation": 40,
+    "top_competitors": [{"name": "Acme", "differentiator": "cheaper"}],
+}
+
+# Deck passages; every topic retrieves an overlapping subset of them
+PASSAGES = [
+    f"Slide {i}: " + "revenue grew with strong unit economics and a large market. " * 8
+    for i in range(8)
+]
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+
+
+def _install_stubs(counter: Counter, latency: float) -> None:
+    def fake_invoke(self, prompt):
+        counter.calls += 1
+        contents = [m["content"] for m in _messages(prompt)]
+        counter.prompt_tokens += count_message_tokens(contents, self.model_name)
+        time.sleep(latency)
+        return AIMessage(content=json.dumps(FUSED_ANSWER))
+
+    def fake_query_doc(startup_id, query, k=3):
+        start = sum(map(ord, query)) % 4
+        return PASSAGES[start : start + k]
+
+    ChatOpenAI.invoke = fake_invoke
+    core.vector_store.query_doc = fake_query_doc
+    core.vector_store.query_topics = lambda startup_id, queries, k=3: {
+        query: fake_query_doc(startup_id, query, k) for query in queries
+    }
+    core.hybrid_context.google_search = lambda query, num_results=3: []
+
+
+def _run_chains(profile: StartupProfile) -> StartupProfile:
+    for _, run_chain, _ in FUSED_CHAINS:
+        profile = run_chain(profile)
+    return profile
+
+
+def _run_fused(profile: StartupProfile) -> StartupProfile:
+    return fused_extraction_chain.run_fused_extraction_chain(profile)
+
+
+def benchmark(latency: float, decks: int) -> dict:
+    counter = Counter()
+    _install_stubs(counter, latency)
+    results = {}
+    for mode, run in (("chains", _run_chains), ("fused", _run_fused)):
+        counter.calls = counter.prompt_tokens = 0
+        start = time.perf_counter()
+        for i in range(decks):
+            run(StartupProfile(startup_id=f"bench{i}", name=f"Deck {i}"))
+        elapsed = time.perf_counter() - start
+        results[mode] = {
+            "round_trips_per_deck": counter.calls / decks,
+            "prompt_tokens_per_deck": counter.prompt_tokens / decks,
+            "wall_s_per_deck": round(elapsed / decks, 3),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per call")
+    parser.add_argument("--decks", type=int, default=3)
+    args = parser.parse_args()
+
+    results = benchmark(args.latency, args.decks)
+    for mode, row in results.items():
+        print(
+            f"{mode:>7}: {row['round_trips_per_deck']:.1f} calls, "
+            f"{row['prompt_tokens_per_deck']:.0f} prompt tokens, "
+            f"{row['wall_s_per_deck']:.2f}s per deck"
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+End-to-end pipeline benchmark over the bundled decks in data/.
+
+Every stage of the memo pipeline is timed per deck – PDF extraction
+(read_pdf_content, ocr.process_pdfs), vector ingest / query, context
+building, each chain, format_memo and PDF rendering (FPDF and WeasyPrint) –
+reporting wall time, CPU time and peak RSS. Then whole decks are pushed
+through main.run_all at concurrency 1, 4 and 16 to get decks/min.
+
+The LLM is benchmarks.stub_server (a subprocess, so its CPU isn't counted)
+and the web backends are core.replay in replay mode, both with fixed
+latency, so numbers are reproducible and need no network or API keys.
+Results go to benchmarks/results/<commit>.json; pass --compare to diff
+against an earlier run.
+
+    python -m benchmarks.pipeline_bench [--llm-latency 0.5] [--web-latency 0.2]
+        [--concurrency 1 4 16] [--decks data/*.pdf] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# ------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------
+def _describe(e: Exception) -> str:
+    return f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"[:200]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:  # not Linux: fall back to the process high-water mark
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler(threading.Thread):
+    """Samples RSS every few ms so each stage gets its own peak."""
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss_bytes()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def stop(self) -> int:
+        self._done.set()
+        self.join()
+        return max(self.peak, _rss_bytes())
+
+
+@contextmanager
+def measure(samples: Dict[str, List[dict]], stage: str):
+    """Record wall / CPU / peak RSS of the block; errors are recorded, not raised."""
+    sampler = RssSampler()
+    sampler.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    row = {}
+    try:
+        yield row
+    except Exception as e:
+        row["error"] = _describe(e)
+    finally:
+        row["wall_s"] = time.perf_counter() - wall
+        row["cpu_s"] = time.process_time() - cpu
+        row["peak_rss_mb"] = sampler.stop() / 1024**2
+        samples.setdefault(stage, []).append(row)
+
+
+def summarize(rows: List[dict]) -> dict:
+    ok = [r for r in rows if "error" not in r]
+    summary = {"runs": len(rows), "errors": len(rows) - len(ok)}
+    if ok:
+        for metric in ("wall_s", "cpu_s"):
+            values = [r[metric] for r in ok]
+            summary[f"{metric}_median"] = round(statistics.median(values), 4)
+            summary[f"{metric}_max"] = round(max(values), 4)
+        summary["peak_rss_mb"] = round(max(r["peak_rss_mb"] for r in ok), 1)
+    if len(ok) < len(rows):
+        summary["last_error"] = next(r["error"] for r in reversed(rows) if "error" in r)
+    return summary
+
+
+# ------------------------------------------------------------------
+# Stubbed backends
+# ------------------------------------------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def stub_backends(llm_latency: float, web_latency: float):
+    """
+    Start the stub LLM server and point every client at stubs; decks are
+    ingested into a throwaway vector store, not the developer's .chroma.
+    """
+    store = tempfile.TemporaryDirectory(prefix="bench-store-")
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_server", "--port", str(port)]
+        + ["--latency", str(llm_latency)],
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f"{base_url}/models", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        os.environ.update(
+            OPENAI_BASE_URL=base_url,
+            OPENAI_API_BASE=base_url,
+            OPENAI_API_KEY="stub",
+            REPLAY_MODE="replay",
+            REPLAY_LATENCY=str(web_latency),
+            LLM_CACHE_BYPASS="1",
+            LLM_RATE_LIMIT_DISABLED="1",
+            # Measure the pipeline, not warm on-disk caches from the last run
+            PDF_TEXT_CACHE_DISABLED="1",
+            EMBEDDING_CACHE_DISABLED="1",
+            CONTEXT_CACHE_DISABLED="1",
+            CHROMA_DB_DIR=store.name,
+            LEXICAL_INDEX_PATH=str(Path(store.name) / "lexical.sqlite"),
+        )
+        os.environ.pop("CHROMA_SERVER_URL", None)
+        yield base_url
+    finally:
+        from core.vector_store import close_store
+
+        close_store()
+        store.cleanup()
+        server.terminate()
+        server.wait()
+
+
+# ------------------------------------------------------------------
+# Benchmarks
+# ------------------------------------------------------------------
+def bench_stages(pdf_path: str, samples: Dict[str, List[dict]], run_id: str) -> None:
+    """Time each pipeline stage once for one deck."""
+    from chains import (
+        competitive_intel_chain,
+        financial_analysis_chain,
+        founder_profiling_chain,
+        market_sizing_chain,
+        risk_assessment_chain,
+        technical_dd_chain,
+    )
+    from chains.pitch_deck_chain import read_pdf_content, run_pitch_deck_chain
+    from core.hybrid_context import get_hybrid_context
+    from core.schemas import StartupProfile
+
+    with measure(samples, "read_pdf_content"):
+        read_pdf_content(pdf_path)
+    with measure(samples, "ocr.process_pdfs"):
+        from memo_api.services import ocr
+
+        asyncio.run(ocr.process_pdfs([pdf_path]))
+
+    sid = f"bench-{run_id}-{Path(pdf_path).stem}"
+    profile = StartupProfile(startup_id=sid, name=Path(pdf_path).stem)
+    with measure(samples, "vector_ingest"):
+        from core.ingest import ingest_pdf
+
+        ingest_pdf(sid, pdf_path)
+    with measure(samples, "vector_query"):
+        from core.vector_store import query_doc
+
+        query_doc(sid, technical_dd_chain.TOPIC, k=3)
+    with measure(samples, "hybrid_context"):
+        get_hybrid_context(profile, market_sizing_chain.TOPIC, 3, 3)
+
+    with measure(samples, "chain.pitch_deck"):
+        run_pitch_deck_chain(pdf_path)
+    for module, run_chain in (
+        (technical_dd_chain, technical_dd_chain.run_technical_dd_chain),
+        (founder_profiling_chain, founder_profiling_chain.run_founder_profiling_chain),
+        (market_sizing_chain, market_sizing_chain.run_market_sizing_chain),
+        (
+            financial_analysis_chain,
+            financial_analysis_chain.run_financial_analysis_chain,
+        ),
+        (competitive_intel_chain, competitive_intel_chain.run_competitive_intel_chain),
+        (risk_assessment_chain, risk_assessment_chain.run_risk_assessment_chain),
+    ):
+        name = module.__name__.rsplit(".", 1)[1].removesuffix("_chain")
+        with measure(samples, f"chain.{name}"):
+            profile = run_chain(profile)
+
+    memo_text = ""
+    with measure(samples, "format_memo"):
+        from main import format_memo
+
+        memo_text = format_memo(profile)
+    with tempfile.TemporaryDirectory() as tmp:
+        with measure(samples, "save_memo_as_pdf"):
+            from main import save_memo_as_pdf
+
+            save_memo_as_pdf(memo_text, os.path.join(tmp, "memo.pdf"))
+    with measure(samples, "weasyprint"):
+        from weasyprint import HTML
+
+        HTML(string=f"<pre>{memo_text}</pre>").write_pdf()
+
+
+def bench_throughput(pdf_paths: List[str], concurrency: int) -> dict:
+    """decks/min through main.run_all with `concurrency` decks in flight."""
+    try:
+        from main import run_all
+    except Exception as e:  # e.g. a backend that can't initialise here
+        return {"error": _describe(e)}
+
+    jobs = [
+        pdf_paths[i % len(pdf_paths)]
+        for i in range(max(len(pdf_paths), 2 * concurrency))
+    ]
+    errors = []
+
+    def one(path):
+        try:
+            run_all(path)
+        except Exception as e:
+            errors.append(_describe(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, jobs))
+    elapsed = time.perf_counter() - start
+    done = len(jobs) - len(errors)
+    result = {
+        "decks": len(jobs),
+        "errors": len(errors),
+        "wall_s": round(elapsed, 3),
+        "decks_per_min": round(done / elapsed * 60, 2),
+    }
+    if errors:
+        result["last_error"] = errors[-1]
+    return result
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict) -> None:
+    """Print median wall-time and throughput deltas against a baseline run."""
+    print(f"\nvs {baseline.get('commit')}:")
+    for stage, row in current["stages"].items():
+        old = baseline.get("stages", {}).get(stage, {})
+        if "wall_s_median" in row and old.get("wall_s_median"):
+            change = row["wall_s_median"] / old["wall_s_median"] - 1
+            print(
+                f"  {stage:<28} {old['wall_s_median']:>8.3f}s -> "
+                f"{row['wall_s_median']:>8.3f}s ({change:+.0%})"
+            )
+    for level, row in current["throughput"].items():
+        old = baseline.get("throughput", {}).get(level, {})
+        if old.get("decks_per_min"):
+            print(
+                f"  concurrency {level:<16} {old['decks_per_min']:>8.2f} -> "
+                f"{row['decks_per_min']:>8.2f} decks/min"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--decks", nargs="+", default=sorted(glob.glob("data/*.pdf")))
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--web-latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--out", default=None, help="results file")
+    parser.add_argument("--compare", default=None, help="earlier results file")
+    args = parser.parse_args()
+    if not args.decks:
+        parser.error("no decks found")
+
+    run_id = str(int(time.time()))
+    samples: Dict[str, List[dict]] = {}
+    with stub_backends(args.llm_latency, args.web_latency):
+        for pdf_path in args.decks:
+            print(f"[stages: {pdf_path}]")
+            bench_stages(pdf_path, samples, run_id)
+        throughput = {}
+        for level in args.concurrency:
+            print(f"[throughput: concurrency {level}]")
+            throughput[str(level)] = bench_throughput(args.decks, level)
+
+    results = {
+        "commit": _commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "decks": args.decks,
+            "llm_latency": args.llm_latency,
+            "web_latency": args.web_latency,
+        },
+        "stages": {stage: summarize(rows) for stage, rows in samples.items()},
+        "throughput": throughput,
+    }
+    out = Path(args.out or RESULTS_DIR / f"{results['commit']}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+
+    for stage, row in results["stages"].items():
+        if "wall_s_median" in row:
+            print(
+                f"{stage:<28} wall {row['wall_s_median']:>8.3f}s  "
+                f"cpu {row['cpu_s_median']:>8.3f}s  rss {row['peak_rss_mb']:>7.1f}MB"
+            )
+        else:
+            print(f"{stage:<28} failed: {row.get('last_error')}")
+    for level, row in throughput.items():
+        if "error" in row:
+            print(f"concurrency {level:<16} failed: {row['error']}")
+            continue
+        print(
+            f"concurrency {level:<16} {row['decks_per_min']:>8.2f} decks/min "
+            f"({row['errors']} errors)"
+        )
+    print(f"\nResults written to {out}")
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+OpenAI-compatible stub server for offline runs and benchmarks.
+
+    python -m benchmarks.stub_server [--port 8765] [--latency 0.5] [--jitter 0.1]
+        [--error-rate 0.05] [--error-status 429] [--record] [--miss synthetic]
+
+Point the pipeline at it with
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub \\
+    REPLAY_MODE=replay LLM_CACHE_BYPASS=1 python main.py data/airbnb.pdf
+
+POST /v1/chat/completions answers from REPLAY_DIR/llm/ (see core.replay),
+keyed on model, messages and temperature, after the configured latency and
+with the configured share of injected errors. With --record it instead
+proxies to the real API (UPSTREAM_OPENAI_BASE_URL, default OpenAI) and saves
+every answer, so a recorded run replays byte-for-byte. Unrecorded requests
+get an empty JSON object as content (--miss synthetic) or a 404 (--miss
+error). GET /stats reports request / hit / miss / error counts.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from aiohttp import ClientSession, web
+
+from core.replay import ReplayMiss, load, replay_dir, request_key, save
+from core.tokens import count_message_tokens
+
+UPSTREAM = os.getenv("UPSTREAM_OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+ERROR_TYPES = {429: "rate_limit_error", 500: "server_error", 503: "server_error"}
+
+CONFIG = web.AppKey("config", argparse.Namespace)
+RNG = web.AppKey("rng", random.Random)
+STATS = web.AppKey("stats", dict)
+SESSION = web.AppKey("session", ClientSession)
+
+
+def llm_request(body: dict) -> dict:
+    """The part of a chat request that identifies its recording."""
+    return {
+        "model": body.get("model"),
+        "messages": body.get("messages"),
+        "temperature": body.get("temperature"),
+    }
+
+
+def _error(status: int, message: str) -> web.Response:
+    error = {"message": message, "type": ERROR_TYPES.get(status, "invalid_request")}
+    return web.json_response({"error": error}, status=status)
+
+
+def _synthetic(body: dict, content: str = "{}") -> dict:
+    contents = [str(m.get("content", "")) for m in body.get("messages", [])]
+    prompt_tokens = count_message_tokens(contents, body.get("model", ""))
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": "chatcmpl-stub-" + request_key(llm_request(body))[:12],
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+async def _stream(request: web.Request, completion: dict) -> web.StreamResponse:
+    """Replay a completion as a one-chunk server-sent-event stream."""
+    resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await resp.prepare(request)
+    choice = completion["choices"][0]
+    base = {k: completion[k] for k in ("id", "created", "model")}
+    chunks = [
+        {"index": 0, "delta": choice["message"], "finish_reason": None},
+        {"index": 0, "delta": {}, "finish_reason": choice.get("finish_reason")},
+    ]
+    for chunk in chunks:
+        event = {**base, "object": "chat.completion.chunk", "choices": [chunk]}
+        await resp.write(f"data: {json.dumps(event)}\n\n".encode())
+    usage = {**base, "object": "chat.completion.chunk", "choices": []}
+    usage["usage"] = completion.get("usage")
+    await resp.write(f"data: {json.dumps(usage)}\n\n".encode())
+    await resp.write(b"data: [DONE]\n\n")
+    await resp.write_eof()
+    return resp
+
+
+async def _forward(app: web.Application, body: dict, auth: Optional[str]):
+    headers = {"Authorization": auth or f"Bearer {os.getenv('OPENAI_API_KEY', '')}"}
+    body = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+    async with app[SESSION].post(
+        f"{UPSTREAM}/chat/completions", json=body, headers=headers
+    ) as resp:
+        return resp.status, await resp.json()
+
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    app, config, stats = request.app, request.app[CONFIG], request.app[STATS]
+    body = await request.json()
+    stats["requests"] += 1
+
+    if config.record:
+        status, completion = await _forward(
+            app, body, request.headers.get("Authorization")
+        )
+        if status != 200:
+            return web.json_response(completion, status=status)
+        save("llm", llm_request(body), completion)
+        stats["recorded"] += 1
+    else:
+        rng = app[RNG]
+        await asyncio.sleep(
+            max(0.0, config.latency + rng.uniform(-1, 1) * config.jitter)
+        )
+        if rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return _error(config.error_status, "injected by stub server")
+        try:
+            completion = load("llm", llm_request(body))
+            stats["hits"] += 1
+        except ReplayMiss:
+            stats["misses"] += 1
+            if config.miss == "error":
+                return _error(404, "no recording for this request")
+            completion = _synthetic(body)
+
+    if body.get("stream"):
+        return await _stream(request, completion)
+    return web.json_response(completion)
+
+
+async def models(request: web.Request) -> web.Response:
+    names = ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo-preview", "o1-mini"]
+    data = [{"id": name, "object": "model", "owned_by": "stub"} for name in names]
+    return web.json_response({"object": "list", "data": data})
+
+
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response(dict(request.app[STATS]))
+
+
+def make_app(config: argparse.Namespace) -> web.Application:
+    app = web.Application(client_max_size=64 * 1024**2)
+    app[CONFIG] = config
+    app[RNG] = random.Random(config.seed)
+    app[STATS] = {"requests": 0, "hits": 0, "misses": 0, "errors": 0, "recorded": 0}
+
+    async def session_ctx(app):
+        app[SESSION] = ClientSession()
+        yield
+        await app[SESSION].close()
+
+    app.cleanup_ctx.append(session_ctx)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/v1/models", models)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0..1")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--miss", choices=["synthetic", "error"], default="synthetic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--record", action="store_true", help="proxy upstream and save responses"
+    )
+    return parser
+
+
+@contextmanager
+def serve_in_background(**options):
+    """
+    Run the stub server on a free port in a background thread; yields its
+    OpenAI base URL. Options are the CLI flags, e.g. latency=0.2.
+    """
+    config = _parser().parse_args([])
+    for name, value in options.items():
+        setattr(config, name, value)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(make_app(config))
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, config.host, 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{config.host}:{port}/v1"
+    finally:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def main() -> None:
+    config = _parser().parse_args()
+    mode = "recording to" if config.record else "replaying from"
+    print(f"[stub server {mode} {replay_dir() / 'llm'}]")
+    web.run_app(make_app(config), host=config.host, port=config.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,14 @@ import json
 from hashlib import sha1
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 
+from core.llm_utils import cached_invoke, acached_invoke, get_chat_model
 from core.schemas import StartupProfile, Competitor
-from core.hybrid_context import get_hybrid_context
+from core.hybrid_context import get_hybrid_context, aget_hybrid_context
 
 load_dotenv(Path(__file__).resolve().parents[1] / ".env")
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2)
+llm = get_chat_model("gpt-3.5-turbo", 0.2)
 
 SYSTEM = """\
 You are a VC analyst mapping the competitive landscape.
@@ -22,10 +22,18 @@ PROMPT = ChatPromptTemplate.from_messages(
     [("system", SYSTEM), ("human", "Sector context:\n{context}\n")]
 )
 
+# StartupProfile fields this chain consumes / fills in (see core.pipeline)
+READS = ("startup_id", "name")
+WRITES = ("top_competitors",)
 
-def run_competitive_intel_chain(profile: StartupProfile) -> StartupProfile:
-    ctx = get_hybrid_context(profile, "competitor OR competition", k_local=3, k_web=3)
-    txt = llm.invoke(PROMPT.format(context=ctx)).content.strip()
+# Checkpoint key component: changes whenever the prompt does
+PROMPT_VERSION = sha1(SYSTEM.encode()).hexdigest()[:8]
+
+# Retrieval query handed to get_hybrid_context
+TOPIC = "competitor OR competition"
+
+
+def _update_profile(profile: StartupProfile, txt: str, ctx: str) -> StartupProfile:
     first, last = txt.find("{"), txt.rfind("}")
     if first == -1 or last == -1:
         return profile
@@ -40,3 +48,19 @@ def run_competitive_intel_chain(profile: StartupProfile) -> StartupProfile:
     if not profile.startup_id:
         profile.startup_id = sha1((profile.name or ctx[:40]).encode()).hexdigest()[:10]
     return profile
+
+
+def run_competitive_intel_chain(profile: StartupProfile) -> StartupProfile:
+    ctx = get_hybrid_context(profile, TOPIC, k_local=3, k_web=3, model=llm.model_name)
+    prompt = PROMPT.format(context=ctx)
+    txt = cached_invoke(llm, prompt).content.strip()
+    return _update_profile(profile, txt, ctx)
+
+
+async def arun_competitive_intel_chain(profile: StartupProfile) -> StartupProfile:
+    ctx = await aget_hybrid_context(
+        profile, TOPIC, k_local=3, k_web=3, model=llm.model_name
+    )
+    prompt = PROMPT.format(context=ctx)
+    txt = (await acached_invoke(llm, prompt)).content.strip()
+    return _update_profile(profile, txt, ctx)
@@ -8,15 +8,15 @@ from hashlib import sha1
 from pathlib import Path
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 
+from core.llm_utils import cached_invoke, acached_invoke, get_chat_model
 from core.schemas import StartupProfile
-from core.hybrid_context import get_hybrid_context
+from core.hybrid_context import get_hybrid_context, aget_hybrid_context
 
 # ------------------------------------------------------------------
 load_dotenv(Path(__file__).resolve().parents[1] / ".env")
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2)
+llm = get_chat_model("gpt-3.5-turbo", 0.2)
 
 SYSTEM = """\
 You are a VC financial analyst.
@@ -31,12 +31,18 @@ PROMPT = ChatPromptTemplate.from_messages(
     [("system", SYSTEM), ("human", "Financial snippets:\n{context}\n")]
 )
 
+# StartupProfile fields this chain consumes / fills in (see core.pipeline)
+READS = ("startup_id", "name")
+WRITES = ("cash_burn_12m", "runway_months", "implied_valuation")
 
-def run_financial_analysis_chain(profile: StartupProfile) -> StartupProfile:
-    context = get_hybrid_context(
-        profile, "funding OR revenue OR burn OR valuation", 3, 3
-    )
-    txt = llm.invoke(PROMPT.format(context=context)).content.strip()
+# Checkpoint key component: changes whenever the prompt does
+PROMPT_VERSION = sha1(SYSTEM.encode()).hexdigest()[:8]
+
+# Retrieval query handed to get_hybrid_context
+TOPIC = "funding OR revenue OR burn OR valuation"
+
+
+def _update_profile(profile: StartupProfile, txt: str, context: str) -> StartupProfile:
     first, last = txt.find("{"), txt.rfind("}")
     if first == -1 or last == -1:
         return profile
@@ -53,3 +59,17 @@ def run_financial_analysis_chain(profile: StartupProfile) -> StartupProfile:
             :10
         ]
     return profile
+
+
+def run_financial_analysis_chain(profile: StartupProfile) -> StartupProfile:
+    context = get_hybrid_context(profile, TOPIC, 3, 3, model=llm.model_name)
+    prompt = PROMPT.format(context=context)
+    txt = cached_invoke(llm, prompt).content.strip()
+    return _update_profile(profile, txt, context)
+
+
+async def arun_financial_analysis_chain(profile: StartupProfile) -> StartupProfile:
+    context = await aget_hybrid_context(profile, TOPIC, 3, 3, model=llm.model_name)
+    prompt = PROMPT.format(context=context)
+    txt = (await acached_invoke(llm, prompt)).content.strip()
+    return _update_profile(profile, txt, context)
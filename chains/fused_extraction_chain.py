@@ -0,0 +1,187 @@
+"""
+Fused extraction chain
+• One structured call that fills everything the technical-DD, founder,
+  market-sizing, financial and competitive-intel chains would, from a single
+  deduplicated context.
+• Any group of fields that comes back missing or invalid is re-done by the
+  owning chain, so the result is never worse than the per-chain pipeline.
+"""
+
+import asyncio
+import json
+from hashlib import sha1
+from pathlib import Path
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from pydantic import BaseModel, ValidationError
+
+from chains import (
+    competitive_intel_chain,
+    financial_analysis_chain,
+    founder_profiling_chain,
+    market_sizing_chain,
+    technical_dd_chain,
+)
+from core.hybrid_context import aget_multi_topic_context, get_multi_topic_context
+from core.llm_utils import acached_invoke, cached_invoke, get_chat_model
+from core.schemas import Competitor, StartupProfile
+
+# ------------------------------------------------------------------
+load_dotenv(Path(__file__).resolve().parents[1] / ".env")
+llm = get_chat_model("gpt-3.5-turbo", 0.2)
+
+# The chains this one stands in for, each owning a group of fields:
+# (module, sync fallback, async fallback)
+FUSED_CHAINS = [
+    (
+        technical_dd_chain,
+        technical_dd_chain.run_technical_dd_chain,
+        technical_dd_chain.arun_technical_dd_chain,
+    ),
+    (
+        founder_profiling_chain,
+        founder_profiling_chain.run_founder_profiling_chain,
+        founder_profiling_chain.arun_founder_profiling_chain,
+    ),
+    (
+        market_sizing_chain,
+        market_sizing_chain.run_market_sizing_chain,
+        market_sizing_chain.arun_market_sizing_chain,
+    ),
+    (
+        financial_analysis_chain,
+        financial_analysis_chain.run_financial_analysis_chain,
+        financial_analysis_chain.arun_financial_analysis_chain,
+    ),
+    (
+        competitive_intel_chain,
+        competitive_intel_chain.run_competitive_intel_chain,
+        competitive_intel_chain.arun_competitive_intel_chain,
+    ),
+]
+
+SYSTEM = """\
+You are a VC analyst doing a first-pass review of a startup.
+Return ONE JSON object with exactly these keys:
+  tech_maturity      – one of ["prototype","beta","production","enterprise"]
+  moat_strength      – ≤25-word description of defensible IP / moat
+  founder_fit_score  – float between 0 and 1 (higher = stronger team)
+  prior_exits        – integer count of the founders' successful past exits
+  TAM SAM SOM        – market sizes, numbers in USD millions
+  cash_burn_12m      – cash burned over 12 months, USD millions (negative = profit)
+  runway_months      – months until cash-out at current burn
+  implied_valuation  – simple post-money valuation in USD millions if round info present
+  top_competitors    – array of up to 3 objects {{name, differentiator}}
+Use null for any value the context doesn't support – never a guess or a
+placeholder such as 0 or "unknown".
+"""
+
+PROMPT = ChatPromptTemplate.from_messages(
+    [("system", SYSTEM), ("human", "Startup context:\n{context}\n")]
+)
+
+# StartupProfile fields this chain consumes / fills in (see core.pipeline)
+READS = ("startup_id", "name")
+WRITES = tuple(field for module, _, _ in FUSED_CHAINS for field in module.WRITES)
+
+# Checkpoint key component: changes whenever the prompt does
+PROMPT_VERSION = sha1(SYSTEM.encode()).hexdigest()[:8]
+
+# Every topic the individual chains would have retrieved for
+TOPICS = [module.TOPIC for module, _, _ in FUSED_CHAINS]
+
+
+class FusedExtraction(BaseModel):
+    tech_maturity: Optional[str] = None
+    moat_strength: Optional[str] = None
+    founder_fit_score: Optional[float] = None
+    prior_exits: Optional[int] = None
+    TAM: Optional[float] = None
+    SAM: Optional[float] = None
+    SOM: Optional[float] = None
+    cash_burn_12m: Optional[float] = None
+    runway_months: Optional[float] = None
+    implied_valuation: Optional[float] = None
+    top_competitors: Optional[List[Competitor]] = None
+
+
+def _valid_fields(txt: str) -> dict:
+    """Fields of the fused answer that are present and pass validation."""
+    first, last = txt.find("{"), txt.rfind("}")
+    if first == -1 or last == -1:
+        return {}
+    try:
+        data = json.loads(txt[first : last + 1])
+    except ValueError as e:
+        print(f"Error processing fused extraction: {e}")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    valid = {}
+    for field in WRITES:
+        # null (or a leftover "unknown") leaves the group to its own chain
+        if data.get(field) is None or data[field] == "unknown":
+            continue
+        try:
+            parsed = FusedExtraction.model_validate({field: data[field]})
+        except ValidationError:
+            continue
+        valid[field] = getattr(parsed, field)
+    if "top_competitors" in valid:
+        valid["top_competitors"] = valid["top_competitors"][:3]
+    return valid
+
+
+def _update_profile(profile: StartupProfile, txt: str, context: str) -> list:
+    """
+    Apply every complete, valid field group to the profile and return the
+    FUSED_CHAINS entries whose groups still need a per-chain call.
+    """
+    valid = _valid_fields(txt)
+    missing = []
+    for entry in FUSED_CHAINS:
+        module = entry[0]
+        if all(field in valid for field in module.WRITES):
+            for field in module.WRITES:
+                setattr(profile, field, valid[field])
+        else:
+            missing.append(entry)
+    if not profile.startup_id:
+        profile.startup_id = sha1((profile.name or context[:40]).encode()).hexdigest()[
+            :10
+        ]
+    return missing
+
+
+def run_fused_extraction_chain(profile: StartupProfile) -> StartupProfile:
+    context = get_multi_topic_context(profile, TOPICS, 3, 3, model=llm.model_name)
+    prompt = PROMPT.format(context=context)
+    txt = cached_invoke(llm, prompt).content.strip()
+    missing = _update_profile(profile, txt, context)
+
+    for module, run_chain, _ in missing:
+        print(f"[fused extraction: falling back to {module.__name__}]")
+        profile = run_chain(profile)
+    return profile
+
+
+async def arun_fused_extraction_chain(profile: StartupProfile) -> StartupProfile:
+    context = await aget_multi_topic_context(
+        profile, TOPICS, 3, 3, model=llm.model_name
+    )
+    prompt = PROMPT.format(context=context)
+    txt = (await acached_invoke(llm, prompt)).content.strip()
+    missing = _update_profile(profile, txt, context)
+
+    # Fallback chains write disjoint fields, so run them side by side on copies
+    results = await asyncio.gather(
+        *(arun_chain(profile.model_copy(deep=True)) for _, _, arun_chain in missing)
+    )
+    for (module, _, _), result in zip(missing, results):
+        print(f"[fused extraction: fell back to {module.__name__}]")
+        for field in module.WRITES:
+            setattr(profile, field, getattr(result, field))
+    return profile
@@ -1,11 +1,24 @@
+import asyncio
 import json
 import os
+
+import aiohttp
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
 from langchain.tools import Tool
 from dotenv import load_dotenv
-import pdfplumber
 from core.schemas import StartupProfile
+from core.context_packer import ContextPacker
+from core.ingest import PAGE_BREAK
+from core.pdf_extract import iter_pages
+from core.replay import areplayed, replayed
+from core.llm_utils import (
+    cache_bypassed,
+    cache_key,
+    estimate_tokens,
+    get_cache,
+    get_chat_model,
+)
+from core.rate_limit import get_limiter
 import requests
 from langchain_core.prompts import ChatPromptTemplate
 from crewai.tools import BaseTool
@@ -18,9 +31,16 @@ import warnings
 # ---------------------------------------------------------------------
 load_dotenv()
 
+# Checkpoint key component – bump whenever the crew task descriptions change
+PROMPT_VERSION = "2"
+
+# Deck text budget per crew task: gpt-4's 8k window also has to hold the task
+# instructions, the agent backstory and the JSON answer
+DECK_CONTEXT_TOKENS = 5000
+
 
 def get_llm():
-    return ChatOpenAI(model="gpt-4", temperature=0.2)
+    return get_chat_model("gpt-4", 0.2)
 
 
 # EXA Search tool for internet research
@@ -32,8 +52,7 @@ class EXASearchTool(BaseTool):
     api_key: str = Field(default_factory=lambda: os.getenv("EXA_API_KEY", ""))
     base_url: str = "https://api.exa.ai/search"
 
-    def _run(self, query: str) -> str:
-        """Run the search tool."""
+    def _request(self, query: str):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -47,18 +66,36 @@ class EXASearchTool(BaseTool):
             "startPublishedDate": "2020-01-01",
             "excludeText": ["advertisement", "sponsored"],
         }
+        return headers, data
+
+    def _post(self, headers, data):
+        response = requests.post(self.base_url, headers=headers, json=data)
+        response.raise_for_status()
+        return response.json()
+
+    async def _apost(self, headers, data):
+        async with aiohttp.ClientSession() as session:
+            async with session.post(self.base_url, headers=headers, json=data) as resp:
+                resp.raise_for_status()
+                return await resp.json()
 
+    def _run(self, query: str) -> str:
+        """Run the search tool."""
+        headers, data = self._request(query)
         try:
-            response = requests.post(self.base_url, headers=headers, json=data)
-            response.raise_for_status()
-            results = response.json()
+            results = replayed("exa", data, lambda: self._post(headers, data))
             return json.dumps(results, indent=2)
         except Exception as e:
             return f"Error performing search: {str(e)}"
 
     async def _arun(self, query: str) -> str:
         """Run the search tool asynchronously."""
-        return self._run(query)
+        headers, data = self._request(query)
+        try:
+            results = await areplayed("exa", data, lambda: self._apost(headers, data))
+            return json.dumps(results, indent=2)
+        except Exception as e:
+            return f"Error performing search: {str(e)}"
 
 
 # Create the search tool
@@ -98,7 +135,7 @@ def create_agent(role: str, goal: str, backstory: str, tools: list = None) -> Ag
         backstory=backstory,
         tools=tools or [],
         verbose=True,
-        llm=ChatOpenAI(model="gpt-4-turbo-preview", temperature=0.7),
+        llm=get_chat_model("gpt-4-turbo-preview", 0.7),
     )
 
 
@@ -140,32 +177,38 @@ class CompetitorInfo(BaseModel):
     competitors: List[Dict] = []
 
 
-def read_pdf_content(pdf_path: str) -> str:
-    """Read and extract text content from PDF with improved error handling."""
+def read_pdf_content(pdf_path: str, max_tokens: Optional[int] = None) -> str:
+    """
+    Read and extract text content from PDF with improved error handling.
+    With `max_tokens`, pages are packed in order (repeats dropped) into that
+    many tokens of the crew's model and reading stops once it is full.
+    """
+    packer = None
+    if max_tokens is not None:
+        packer = ContextPacker(max_tokens, get_llm().model_name, PAGE_BREAK)
     try:
         content = []
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                try:
-                    text = page.extract_text()
-                    if text:
-                        content.append(text)
-                except Exception as e:
-                    print(f"Warning: Error extracting text from page: {e}")
-                    continue
-        return "\n---PAGE BREAK---\n".join(content)
+        pages = iter_pages(pdf_path)
+        for page in pages:
+            if page.error:
+                print(
+                    f"Warning: Error extracting text from page {page.page_no}: "
+                    f"{page.error}"
+                )
+            elif packer is not None:
+                if not packer.add(page.text):
+                    pages.close()  # budget full; don't parse the rest
+                    break
+            elif page.text:
+                content.append(page.text)
+        return packer.text() if packer is not None else PAGE_BREAK.join(content)
     except Exception as e:
         print(f"Error reading PDF: {e}")
         return ""
 
 
-def run_pitch_deck_chain(pdf_path: str) -> StartupProfile:
-    """Run the pitch deck analysis chain."""
-    # Read PDF content
-    pdf_content = read_pdf_content(pdf_path)
-    if not pdf_content:
-        raise ValueError("Failed to extract content from PDF")
-
+def _build_crew(pdf_content: str) -> Crew:
+    """Assemble the company / market / competitor crew for one deck."""
     # Create agents
     company_analyst = Agent(
         role="Company Analyst",
@@ -297,57 +340,103 @@ def run_pitch_deck_chain(pdf_path: str) -> StartupProfile:
         name="competitor_analysis",
     )
 
-    # Create and run crew
-    crew = Crew(
+    # Create crew
+    return Crew(
         agents=[company_analyst, market_analyst, competitor_analyst],
         tasks=[company_task, market_task, competitor_task],
         verbose=True,
         process=Process.sequential,
     )
 
-    result = crew.kickoff()
 
-    # Parse results using task names
-    try:
-        # Access results from the crew output
-        company_info = {}
-        market_info = {}
-        competitor_info = {}
-
-        # Extract results from each task's output
-        for task in result.tasks:
-            try:
-                if task.name == "company_analysis":
-                    # Clean the output to ensure it's valid JSON
-                    output = task.output.strip()
-                    if output.startswith("```json"):
-                        output = output[7:]
-                    if output.endswith("```"):
-                        output = output[:-3]
-                    company_info = json.loads(output.strip())
-                elif task.name == "market_analysis":
-                    output = task.output.strip()
-                    if output.startswith("```json"):
-                        output = output[7:]
-                    if output.endswith("```"):
-                        output = output[:-3]
-                    market_info = json.loads(output.strip())
-                elif task.name == "competitor_analysis":
-                    output = task.output.strip()
-                    if output.startswith("```json"):
-                        output = output[7:]
-                    if output.endswith("```"):
-                        output = output[:-3]
-                    competitor_info = json.loads(output.strip())
-            except json.JSONDecodeError as e:
-                print(f"Error parsing {task.name} output: {e}")
-                print(f"Raw output: {task.output}")
+def _task_messages(task: Task) -> List[dict]:
+    return [
+        {"role": "system", "content": task.agent.backstory},
+        {"role": "human", "content": task.description},
+    ]
+
+
+def _task_cache_keys(crew: Crew) -> Dict[str, str]:
+    """LLM-cache key per task, from the model settings and the task prompt."""
+    llm = get_llm()
+    return {
+        task.name: cache_key(llm.model_name, llm.temperature, _task_messages(task))
+        for task in crew.tasks
+    }
+
+
+def _kickoff(crew: Crew):
+    """
+    crew.kickoff() under the LLM rate limiter. The agents call the model
+    themselves, past cached_invoke, so each task's estimated tokens are
+    drawn before it starts (the next task's from the task callback) and the
+    total is settled against the crew's reported usage at the end.
+    """
+    limiter = get_limiter()
+    if limiter is None:
+        return crew.kickoff()
+    llm = get_llm()
+    estimates = [estimate_tokens(llm, _task_messages(task)) for task in crew.tasks]
+    pending = iter(estimates)
+
+    def before_next_task(_output):
+        tokens = next(pending, None)
+        if tokens is not None:
+            limiter.acquire(llm.model_name, tokens)
+
+    before_next_task(None)
+    crew.task_callback = before_next_task
+    result = crew.kickoff()
+    used = getattr(getattr(result, "token_usage", None), "total_tokens", 0)
+    if used:
+        limiter.settle(llm.model_name, sum(estimates), used)
+    return result
+
+
+def _cached_outputs(keys: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """Raw task outputs from the LLM cache, or None unless every task hits."""
+    if cache_bypassed():
+        return None
+    cache = get_cache()
+    outputs = {name: cache.get(key) for name, key in keys.items()}
+    if any(raw is None for raw in outputs.values()):
+        return None
+    return outputs
+
+
+def _store_outputs(keys: Dict[str, str], result) -> Dict[str, str]:
+    outputs = {task.name: task.raw for task in result.tasks_output}
+    if not cache_bypassed():
+        model = get_llm().model_name
+        for name, raw in outputs.items():
+            if name in keys:
+                get_cache().put(keys[name], model, raw)
+    return outputs
+
+
+def _parse_output(raw: str) -> dict:
+    # Clean the output to ensure it's valid JSON
+    output = raw.strip()
+    if output.startswith("```json"):
+        output = output[7:]
+    if output.endswith("```"):
+        output = output[:-3]
+    return json.loads(output.strip())
+
+
+def _profile_from_outputs(outputs: Dict[str, str]) -> StartupProfile:
+    """Turn the raw task outputs (keyed by task name) into a StartupProfile."""
+    parsed = {}
+    for name, raw in outputs.items():
+        try:
+            parsed[name] = _parse_output(raw)
+        except json.JSONDecodeError as e:
+            print(f"Error parsing {name} output: {e}")
+            print(f"Raw output: {raw}")
 
-    except Exception as e:
-        print(f"Error processing results: {e}")
-        company_info = {}
-        market_info = {}
-        competitor_info = {}
+    company_info = parsed.get("company_analysis", {})
+    market_info = parsed.get("market_analysis", {})
+    competitor_info = parsed.get("competitor_analysis", {})
 
     # Create profile with proper model instances
     profile = StartupProfile(
@@ -365,3 +454,35 @@ def run_pitch_deck_chain(pdf_path: str) -> StartupProfile:
     )
 
     return profile
+
+
+def run_pitch_deck_chain(pdf_path: str) -> StartupProfile:
+    """Run the pitch deck analysis chain."""
+    # Read PDF content
+    pdf_content = read_pdf_content(pdf_path, DECK_CONTEXT_TOKENS)
+    if not pdf_content:
+        raise ValueError("Failed to extract content from PDF")
+
+    crew = _build_crew(pdf_content)
+    keys = _task_cache_keys(crew)
+    outputs = _cached_outputs(keys)
+    if outputs is None:
+        outputs = _store_outputs(keys, _kickoff(crew))
+    return _profile_from_outputs(outputs)
+
+
+async def arun_pitch_deck_chain(pdf_path: str) -> StartupProfile:
+    """Awaitable run_pitch_deck_chain; PDF parsing happens off the event loop."""
+    pdf_content = await asyncio.to_thread(
+        read_pdf_content, pdf_path, DECK_CONTEXT_TOKENS
+    )
+    if not pdf_content:
+        raise ValueError("Failed to extract content from PDF")
+
+    crew = _build_crew(pdf_content)
+    keys = _task_cache_keys(crew)
+    outputs = _cached_outputs(keys)
+    if outputs is None:
+        # As crew.kickoff_async() does: the crew runs on a worker thread
+        outputs = _store_outputs(keys, await asyncio.to_thread(_kickoff, crew))
+    return _profile_from_outputs(outputs)
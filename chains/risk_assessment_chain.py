@@ -8,13 +8,14 @@ from pathlib import Path
 from hashlib import sha1
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 
+from core.llm_utils import cached_invoke, acached_invoke, get_chat_model
 from core.schemas import StartupProfile
+from core.pipeline import ALL_FIELDS
 
 load_dotenv(Path(__file__).resolve().parents[1] / ".env")
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2)
+llm = get_chat_model("gpt-3.5-turbo", 0.2)
 
 SYSTEM = """\
 You are an investment-risk officer.
@@ -27,9 +28,15 @@ PROMPT = ChatPromptTemplate.from_messages(
     [("system", SYSTEM), ("human", "Profile:\n```json\n{profile}\n```")]
 )
 
+# StartupProfile fields this chain consumes / fills in (see core.pipeline)
+READS = ALL_FIELDS
+WRITES = ("risk_flags", "risk_score")
 
-def run_risk_assessment_chain(profile: StartupProfile) -> StartupProfile:
-    txt = llm.invoke(PROMPT.format(profile=profile.model_dump_json())).content.strip()
+# Checkpoint key component: changes whenever the prompt does
+PROMPT_VERSION = sha1(SYSTEM.encode()).hexdigest()[:8]
+
+
+def _update_profile(profile: StartupProfile, txt: str) -> StartupProfile:
     first, last = txt.find("{"), txt.rfind("}")
     if first == -1 or last == -1:
         return profile
@@ -43,3 +50,15 @@ def run_risk_assessment_chain(profile: StartupProfile) -> StartupProfile:
     if not profile.startup_id:
         profile.startup_id = sha1((profile.name or "risk").encode()).hexdigest()[:10]
     return profile
+
+
+def run_risk_assessment_chain(profile: StartupProfile) -> StartupProfile:
+    prompt = PROMPT.format(profile=profile.model_dump_json())
+    txt = cached_invoke(llm, prompt).content.strip()
+    return _update_profile(profile, txt)
+
+
+async def arun_risk_assessment_chain(profile: StartupProfile) -> StartupProfile:
+    prompt = PROMPT.format(profile=profile.model_dump_json())
+    txt = (await acached_invoke(llm, prompt)).content.strip()
+    return _update_profile(profile, txt)
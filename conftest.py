@@ -1,7 +1,19 @@
 # conftest.py
+import os
 import sys
 from pathlib import Path
 
 root = Path(__file__).resolve().parent
 if str(root) not in sys.path:  # idempotent
     sys.path.insert(0, str(root))
+
+# Tests stub the LLM and the PDF parser; never let those stubs leak into
+# (or out of) the on-disk response, text, embedding and context caches.
+os.environ.setdefault("LLM_CACHE_BYPASS", "1")
+os.environ.setdefault("PDF_TEXT_CACHE_DISABLED", "1")
+os.environ.setdefault("EMBEDDING_CACHE_DISABLED", "1")
+os.environ.setdefault("CONTEXT_CACHE_DISABLED", "1")
+# Stubbed calls cost nothing; keep them out of the shared rate-limit buckets.
+os.environ.setdefault("LLM_RATE_LIMIT_DISABLED", "1")
+# Embed with the local hashing backend: no model download during tests.
+os.environ.setdefault("EMBEDDING_BACKEND", "hash")
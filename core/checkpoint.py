@@ -0,0 +1,101 @@
+"""
+Stage checkpoints for resumable pipeline runs.
+
+Each finished stage's output is stored in a local SQLite file under
+(deck sha256, stage name, prompt version). A rerun on the same deck restores
+those outputs instead of calling the LLM again; editing a chain's prompt
+changes its version and therefore misses the old checkpoint.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+
+DEFAULT_DB = os.getenv("CHECKPOINT_DB", ".cache/checkpoints.sqlite")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """SQLite-backed stage store; one short-lived connection per call."""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS checkpoints (
+                    deck_hash TEXT, stage TEXT, version TEXT,
+                    data TEXT, created REAL,
+                    PRIMARY KEY (deck_hash, stage, version))""")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, deck_hash: str, stage: str, version: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM checkpoints"
+                " WHERE deck_hash=? AND stage=? AND version=?",
+                (deck_hash, stage, version),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, deck_hash: str, stage: str, version: str, data: dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                (deck_hash, stage, version, json.dumps(data), time.time()),
+            )
+
+    def invalidate(self, deck_hash: str, stage: Optional[str] = None) -> None:
+        """Drop one stage (every version) or, with no stage, the whole deck."""
+        with self._connect() as conn:
+            if stage is None:
+                conn.execute("DELETE FROM checkpoints WHERE deck_hash=?", (deck_hash,))
+            else:
+                conn.execute(
+                    "DELETE FROM checkpoints WHERE deck_hash=? AND stage=?",
+                    (deck_hash, stage),
+                )
+
+
+class DeckCheckpoint:
+    """A CheckpointStore bound to one deck, as consumed by core.pipeline."""
+
+    def __init__(
+        self,
+        store: CheckpointStore,
+        deck_hash: str,
+        force_stages: Iterable[str] = (),
+    ):
+        self.store = store
+        self.deck_hash = deck_hash
+        for stage in force_stages:
+            store.invalidate(deck_hash, stage)
+
+    @classmethod
+    def for_pdf(cls, pdf_path: str, force_stages: Iterable[str] = (), store=None):
+        return cls(store or CheckpointStore(), file_sha256(pdf_path), force_stages)
+
+    def load(self, stage) -> Optional[dict]:
+        return self.store.get(self.deck_hash, stage.name, stage.version)
+
+    def save(self, stage, data: dict) -> None:
+        self.store.put(self.deck_hash, stage.name, stage.version, data)
@@ -0,0 +1,152 @@
+"""
+Memoised hybrid contexts.
+
+An assembled context (vector snippets plus fetched web pages, packed into a
+token budget) is stored under its startup_id, topic(s), retrieval settings
+and the startup's corpus version. Ingesting new chunks for a startup bumps
+its version (see core.ingest), so its old contexts are never served again;
+web content expires after CONTEXT_CACHE_TTL_HOURS. Re-running a chain – or
+the same chain for another request – then skips both the vector query and
+the web fetches.
+
+Hot contexts are kept in an in-process LRU in front of a SQLite file, like
+core.text_cache. CONTEXT_CACHE_PATH moves it and CONTEXT_CACHE_DISABLED=1
+turns it off.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+CACHE_PATH = os.getenv("CONTEXT_CACHE_PATH", ".cache/contexts.sqlite")
+CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL_HOURS", 24)) * 3600
+MEMORY_ENTRIES = 256
+
+
+class ContextCache:
+    """Contexts by key, plus a version counter per startup's corpus."""
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: float = CACHE_TTL,
+        memory_entries: int = MEMORY_ENTRIES,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS contexts (
+                    key TEXT PRIMARY KEY, sid TEXT, text TEXT, created REAL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS corpus (
+                    sid TEXT PRIMARY KEY, version INTEGER)""")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def version(self, sid: str) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version FROM corpus WHERE sid=?", (sid,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, sid: str) -> None:
+        """New chunks for `sid`: retire every context built from the old ones."""
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO corpus VALUES (?, 1) ON CONFLICT(sid)
+                DO UPDATE SET version = version + 1""",
+                (sid,),
+            )
+            conn.execute("DELETE FROM contexts WHERE sid=?", (sid,))
+        with self._lock:
+            for key in [k for k, (s, _, _) in self._memory.items() if s == sid]:
+                del self._memory[key]
+
+    def key(self, sid: str, **parts) -> str:
+        """Cache key for a context of `sid` at its current corpus version."""
+        parts = {"sid": sid, "version": self.version(sid), **parts}
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        fresh_after = time.time() - self.ttl
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[2] > fresh_after:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT sid, text, created FROM contexts WHERE key=? AND created>?",
+                (key, fresh_after),
+            ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, tuple(row))
+        return row[1]
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, sid: str, text: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO contexts VALUES (?, ?, ?, ?)",
+                (key, sid, text, now),
+            )
+            conn.execute("DELETE FROM contexts WHERE created<=?", (now - self.ttl,))
+        with self._lock:
+            self._remember(key, (sid, text, now))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM contexts")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM contexts").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "contexts": count}
+
+
+_cache: Optional[ContextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_context_cache() -> Optional[ContextCache]:
+    """Process-wide ContextCache, or None when disabled."""
+    global _cache
+    if os.getenv("CONTEXT_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ContextCache()
+        return _cache
@@ -0,0 +1,125 @@
+"""
+Token-budgeted context packing.
+
+Prompts used to be cut to a fixed number of characters, which both wastes
+tokens on repeated snippets and lets long inputs overflow the model window.
+pack_context instead ranks snippets (best retrieval score first), drops
+near-duplicates, and greedily fills a budget counted in the target model's
+own tokens. The first snippet that no longer fits is cut at a token
+boundary rather than dropped, so a single long document still yields its
+head, and packing stops there.
+"""
+
+import re
+from typing import List, Optional, Sequence
+
+from core.tokens import count_tokens, truncate_tokens
+
+# Jaccard similarity of word shingles above which two snippets are duplicates
+NEAR_DUPLICATE = 0.8
+SHINGLE_WORDS = 5
+
+# A partial snippet shorter than this isn't worth its separator
+MIN_PARTIAL_TOKENS = 32
+
+
+def _shingles(text: str) -> frozenset:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return frozenset([" ".join(words)])
+    return frozenset(
+        " ".join(words[i : i + SHINGLE_WORDS])
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    )
+
+
+def _near_duplicate(a: frozenset, b: frozenset) -> bool:
+    if not a or not b:
+        return a == b
+    return len(a & b) / len(a | b) >= NEAR_DUPLICATE
+
+
+def rank_by_position(*ranked_lists: Sequence[str]) -> List[float]:
+    """
+    Reciprocal-rank scores for several already-ranked result lists (e.g.
+    vector hits and web pages), flattened in argument order, so the top
+    hit of every source outranks the runner-up of any other.
+    """
+    return [1.0 / (i + 1) for results in ranked_lists for i in range(len(results))]
+
+
+class ContextPacker:
+    """
+    Incremental packing: offer snippets best-first with add() until it
+    returns False, then read text(). Lets a producer such as a page stream
+    stop as soon as the budget is full.
+    """
+
+    def __init__(
+        self, max_tokens: int, model: str = "gpt-3.5-turbo", separator: str = "\n\n"
+    ):
+        self.model = model
+        self.separator = separator
+        self.remaining = max_tokens
+        self.full = max_tokens <= 0
+        self._sep_tokens = count_tokens(separator, model)
+        self._chosen: List[tuple] = []
+        self._seen: List[frozenset] = []
+
+    def add(self, snippet: str, key=None) -> bool:
+        """Take `snippet` unless empty or a near-duplicate; False once full."""
+        if self.full:
+            return False
+        text = (snippet or "").strip()
+        if not text:
+            return True
+        shingles = _shingles(text)
+        if any(_near_duplicate(shingles, s) for s in self._seen):
+            return True
+        sep = self._sep_tokens if self._chosen else 0
+        cost = count_tokens(text, self.model) + sep
+        if cost > self.remaining:
+            room = self.remaining - sep
+            if room >= MIN_PARTIAL_TOKENS:
+                self._chosen.append((key, truncate_tokens(text, room, self.model)))
+            self.full = True
+            return False
+        self._chosen.append((key, text))
+        self._seen.append(shingles)
+        self.remaining -= cost
+        return True
+
+    def text(self, keep_order: bool = False) -> str:
+        """The packed context; with `keep_order`, in ascending key order."""
+        chosen = (
+            sorted(self._chosen, key=lambda c: c[0]) if keep_order else self._chosen
+        )
+        return self.separator.join(text for _, text in chosen)
+
+
+def pack_context(
+    snippets: Sequence[str],
+    max_tokens: int,
+    model: str = "gpt-3.5-turbo",
+    scores: Optional[Sequence[float]] = None,
+    keep_order: bool = False,
+    separator: str = "\n\n",
+) -> str:
+    """
+    Join the best `snippets` into at most `max_tokens` tokens of `model`.
+
+    Snippets are taken highest `scores` first (retrieval order when no
+    scores are given), skipping empty ones and near-duplicates of anything
+    already taken, until one no longer fits. With `keep_order` the chosen
+    snippets are emitted in their original order (e.g. deck pages) instead
+    of rank order.
+    """
+    order = list(range(len(snippets)))
+    if scores is not None:
+        order.sort(key=lambda i: -scores[i])  # stable: ties keep input order
+
+    packer = ContextPacker(max_tokens, model, separator)
+    for i in order:
+        if not packer.add(snippets[i], key=i):
+            break
+    return packer.text(keep_order)
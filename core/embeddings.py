@@ -0,0 +1,256 @@
+"""
+Embedding functions for the vector store, with a persistent vector cache.
+
+Every text Chroma embeds – ingested chunks and query strings alike – goes
+through CachedEmbeddingFunction, which looks vectors up by (model, sha256 of
+the text) first and embeds only the misses, in one batch. The fixed topic
+queries every chain issues and re-ingested chunks are therefore embedded
+once per machine, not once per deck.
+
+EMBEDDING_BACKEND picks the model:
+
+    default                Chroma's all-MiniLM-L6-v2 on onnxruntime (the
+                           model is downloaded once, then runs offline)
+    sentence-transformers  EMBEDDING_MODEL via sentence-transformers
+    hash                   feature hashing; no model, no network, lower
+                           quality – for tests, benchmarks and air-gapped runs
+
+EMBEDDING_CACHE_PATH moves the cache and EMBEDDING_CACHE_DISABLED=1 turns it
+off.
+"""
+
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils.embedding_functions import register_embedding_function
+
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite")
+HASH_DIM = 384  # same width as all-MiniLM-L6-v2
+
+# Hot vectors (the topic queries) are also kept in memory
+MEMORY_ENTRIES = 4096
+
+# SQLite's default limit on host parameters per statement is 999
+_LOOKUP_BATCH = 500
+
+
+class EmbeddingCache:
+    """float32 vectors by (model, text sha256), one short-lived connection per call."""
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS vectors (
+                    model TEXT, text_hash TEXT, vector BLOB, created REAL,
+                    PRIMARY KEY (model, text_hash))""")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _remember(self, key: tuple, vector: List[float]) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for h in hashes:
+                if (model, h) in self._memory:
+                    found[h] = self._memory[(model, h)]
+        rest = [h for h in dict.fromkeys(hashes) if h not in found]
+        if rest:
+            with self._connect() as conn:
+                for i in range(0, len(rest), _LOOKUP_BATCH):
+                    chunk = rest[i : i + _LOOKUP_BATCH]
+                    rows = conn.execute(
+                        f"""SELECT text_hash, vector FROM vectors WHERE model=?
+                        AND text_hash IN ({",".join("?" * len(chunk))})""",
+                        [model, *chunk],
+                    ).fetchall()
+                    for h, blob in rows:
+                        found[h] = array("f", blob).tolist()
+                        self._remember((model, h), found[h])
+        with self._lock:
+            self.hits += sum(h in found for h in hashes)
+            self.misses += sum(h not in found for h in hashes)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?)",
+                [
+                    (model, h, array("f", vector).tobytes(), now)
+                    for h, vector in vectors.items()
+                ],
+            )
+        for h, vector in vectors.items():
+            self._remember((model, h), vector)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM vectors")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "vectors": count}
+
+
+# ------------------------------------------------------------------
+# Backends: text batch -> list of vectors
+# ------------------------------------------------------------------
+_WORD = re.compile(r"\w+")
+
+
+def hash_embed(texts: List[str], dim: int = HASH_DIM) -> List[List[float]]:
+    """Signed feature hashing of words and word pairs, L2-normalised."""
+    vectors = []
+    for text in texts:
+        vec = [0.0] * dim
+        words = _WORD.findall(text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = int.from_bytes(
+                hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big"
+            )
+            vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        vectors.append([v / norm for v in vec])
+    return vectors
+
+
+def _onnx_backend(model: str):
+    from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import (
+        ONNXMiniLM_L6_V2,
+    )
+
+    embed = ONNXMiniLM_L6_V2()  # one instance, so the model loads once
+    return lambda texts: [list(map(float, v)) for v in embed(texts)]
+
+
+def _sentence_transformers_backend(model: str):
+    from sentence_transformers import SentenceTransformer  # optional dependency
+
+    encoder = SentenceTransformer(model)
+    return lambda texts: encoder.encode(texts, normalize_embeddings=True).tolist()
+
+
+BACKENDS = {
+    "default": (_onnx_backend, "all-MiniLM-L6-v2"),
+    "sentence-transformers": (
+        _sentence_transformers_backend,
+        os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+    ),
+    "hash": (lambda model: hash_embed, f"hash-{HASH_DIM}"),
+}
+
+
+def backend_name() -> str:
+    return os.getenv("EMBEDDING_BACKEND", "default").lower()
+
+
+@register_embedding_function
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """A backend from BACKENDS behind an EmbeddingCache."""
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        model: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.backend = backend or backend_name()
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND {self.backend!r}")
+        factory, default_model = BACKENDS[self.backend]
+        self.model = model or default_model
+        self.cache = cache
+        self._factory = factory
+        self._embed = None
+        self._lock = threading.Lock()
+
+    def _backend(self):
+        with self._lock:  # load the model on first miss only
+            if self._embed is None:
+                self._embed = self._factory(self.model)
+            return self._embed
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = list(input)
+        if self.cache is None:
+            return self._backend()(texts)
+        key = f"{self.backend}/{self.model}"
+        hashes = [hashlib.sha256(t.encode()).hexdigest() for t in texts]
+        found = self.cache.get_many(key, hashes)
+        missing = {h: t for h, t in zip(hashes, texts) if h not in found}
+        if missing:
+            vectors = self._backend()(list(missing.values()))
+            fresh = dict(zip(missing, vectors))
+            self.cache.put_many(key, fresh)
+            found.update(fresh)
+        return [found[h] for h in hashes]
+
+    @staticmethod
+    def name() -> str:
+        return "cached"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "model": self.model}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "CachedEmbeddingFunction":
+        return CachedEmbeddingFunction(
+            config.get("backend"), config.get("model"), get_embedding_cache()
+        )
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide EmbeddingCache, or None when disabled."""
+    global _cache
+    if os.getenv("EMBEDDING_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+
+def get_embedding_function() -> CachedEmbeddingFunction:
+    return CachedEmbeddingFunction(cache=get_embedding_cache())
+
+
+def collection_name(base: str, embed: CachedEmbeddingFunction) -> str:
+    """One collection per embedding model: vectors of different models can't mix."""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", f"{base}-{embed.backend}-{embed.model}")
@@ -0,0 +1,71 @@
+"""
+Streaming visible-text extraction for web snippets.
+
+A web snippet only keeps the first max_chars of a page's text, so there is
+no point building a whole document tree: TextExtractor is an HTMLParser
+that is fed the body as it downloads, drops script/style and other
+invisible elements, and reports when it has collected enough text so the
+download can stop (see core.web_fetch.read_html). The text between tags is
+joined with newlines, like BeautifulSoup's get_text(separator="\\n").
+"""
+
+from html.parser import HTMLParser
+from typing import List
+
+# Elements whose content is never shown
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+
+class TextExtractor(HTMLParser):
+    """Collects up to max_chars of visible text from fed HTML."""
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.consumed = 0  # characters of HTML fed so far
+        self._pieces: List[str] = []
+        self._length = 0
+        self._skip = 0
+        self._open = False  # last piece may still grow (text split across feeds)
+
+    @property
+    def full(self) -> bool:
+        return self._length >= self.max_chars
+
+    def feed(self, data: str) -> bool:
+        """Parse more HTML; True once max_chars of text have been collected."""
+        if not self.full:
+            self.consumed += len(data)
+            super().feed(data)
+        return self.full
+
+    def handle_starttag(self, tag, attrs):
+        self._open = False
+        if tag in SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        self._open = False
+        if tag in SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if self._skip or self.full:
+            return
+        if self._open:
+            self._pieces[-1] += data
+        else:
+            self._pieces.append(data)
+            self._length += 1  # the newline joining it
+            self._open = True
+        self._length += len(data)
+
+    def text(self) -> str:
+        self.close()
+        return "\n".join(self._pieces)[: self.max_chars]
+
+
+def html_to_text(html: str, max_chars: int) -> str:
+    extractor = TextExtractor(max_chars)
+    extractor.feed(html)
+    return extractor.text()
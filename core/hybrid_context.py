@@ -1,41 +1,277 @@
+import asyncio
+
 from googlesearch import search
-import requests
-from bs4 import BeautifulSoup
 
+from core.context_cache import get_context_cache
+from core.context_packer import pack_context, rank_by_position
+from core.html_text import TextExtractor
+from core.replay import areplayed, replay_mode, replayed
+from core.retrieval import local_snippets, local_snippets_many
+from core.singleflight import SingleFlight
+from core.vector_store import RetrievalError
+from core.web_fetch import (
+    HEADERS,
+    WEB_DEADLINE,
+    arun,
+    get_session,
+    read_html,
+    run,
+    within,
+)
 
-def google_search(query, num_results=3):
+# Prompt-token budgets for the retrieved context (see core.context_packer)
+CONTEXT_TOKENS = 1000
+MULTI_TOPIC_CONTEXT_TOKENS = 2000
+
+
+# Identical in-flight searches / page loads share one request
+search_flight = SingleFlight("google_search")
+fetch_flight = SingleFlight("fetch_page")
+
+
+def _google_search(query, num_results):
     try:
-        return list(search(query, num_results=num_results, lang="en"))
+        return replayed(
+            "google",
+            {"query": query, "num_results": num_results},
+            lambda: list(search(query, num_results=num_results, lang="en")),
+        )
     except Exception as e:
         print(f"Google search failed: {e}")
-        return []
+        return None
+
+
+def google_search(query, num_results=3):
+    """Result URLs, or None if the search failed."""
+    return search_flight.do(
+        (query, num_results), lambda: _google_search(query, num_results)
+    )
 
 
 def fetch_page_text(url, max_chars=1500):
+    """Page text ("" for non-HTML pages), or None if the fetch failed."""
+    return run(afetch_page_text(None, url, max_chars))
+
+
+def _combine(local_lists, web_texts, max_tokens, model):
+    # Best-ranked local and web snippets first, near-duplicates dropped
+    snippets = [snip for snips in local_lists for snip in snips] + list(web_texts)
+    scores = rank_by_position(*local_lists, web_texts)
+    context = pack_context(snippets, max_tokens, model, scores=scores)
+    return context or "No local or web info found."
+
+
+def _dedupe(snippets):
+    """Drop repeated URLs (whitespace- and case-insensitive)."""
+    seen, out = set(), []
+    for snippet in snippets:
+        key = " ".join(snippet.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            out.append(snippet)
+    return out
+
+
+def _threaded_search(query, num_results):
+    # Resolved at call time, so a patched google_search is honoured
+    return asyncio.to_thread(google_search, query, num_results=num_results)
+
+
+def _local(sid, topic, k):
+    """(snippets, ok); after a failed lookup, whatever part of it succeeded."""
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        resp = requests.get(url, timeout=5, headers=headers)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # Remove script/style
-        for script in soup(["script", "style"]):
-            script.extract()
-        text = soup.get_text(separator="\n")
-        return text[:max_chars]
+        return local_snippets(sid, topic, k), True
+    except RetrievalError as e:
+        return e.results.get(topic, []), False
+
+
+def _local_many(sid, topics, k):
+    try:
+        return local_snippets_many(sid, topics, k), True
+    except RetrievalError as e:
+        return [e.results.get(topic, []) for topic in topics], False
+
+
+async def _web_texts(name, topics, k_web, search_fn):
+    """
+    Search every topic, then load all hits at once on the shared session.
+    Returns (texts in search order, complete); complete is False when a
+    search or page load failed or hadn't finished by WEB_DEADLINE.
+    """
+    deadline = asyncio.get_running_loop().time() + WEB_DEADLINE
+    url_lists = await within(
+        deadline, [search_fn(f"{name} {topic}", num_results=k_web) for topic in topics]
+    )
+    urls = _dedupe(url for urls in url_lists if urls for url in urls if url)
+    texts = await within(deadline, [afetch_page_text(None, url) for url in urls])
+    complete = None not in url_lists and None not in texts
+    return [text for text in texts if text], complete
+
+
+def _cached(profile, kind, topics, **settings):
+    """
+    (cache, key, context) for a context request; context is None on a miss,
+    and cache is None when contexts can't be memoised (no cache, no id yet).
+    Only contexts built from successful lookups are put back, so a failed
+    vector query or search isn't served for CONTEXT_CACHE_TTL_HOURS.
+    """
+    cache = get_context_cache()
+    sid = getattr(profile, "startup_id", None)
+    if cache is None or not sid:
+        return None, None, None
+    key = cache.key(
+        sid,
+        kind=kind,
+        topics=list(topics),
+        name=getattr(profile, "name", "") or "",
+        **settings,
+    )
+    return cache, key, cache.get(key)
+
+
+def get_hybrid_context(
+    profile,
+    topic,
+    k_local=3,
+    k_web=2,
+    max_tokens=CONTEXT_TOKENS,
+    model="gpt-3.5-turbo",
+):
+    cache, key, context = _cached(
+        profile, "hybrid", [topic], k=(k_local, k_web), tokens=max_tokens, model=model
+    )
+    if context is not None:
+        return context
+
+    # Local context, then the web searches and page loads all at once
+    name = getattr(profile, "name", "") or ""
+    local, local_ok = _local(getattr(profile, "startup_id", None), topic, k_local)
+    web_texts, complete = run(_web_texts(name, [topic], k_web, _threaded_search))
+    context = _combine([local], web_texts, max_tokens, model)
+    if cache is not None and local_ok and complete:
+        cache.put(key, profile.startup_id, context)
+    return context
+
+
+# ------------------------------------------------------------------
+# Async variants – same behaviour, but nothing blocks the event loop.
+# ------------------------------------------------------------------
+async def agoogle_search(query, num_results=3):
+    # googlesearch has no async API, so keep it off the loop
+    return await search_flight.ado(
+        (query, num_results),
+        lambda: asyncio.to_thread(_google_search, query, num_results),
+    )
+
+
+async def afetch_page_text(session, url, max_chars=1500):
+    """
+    Page text of `url` (None if the fetch failed); session=None uses the
+    shared one (on the fetch loop).
+    """
+    return await fetch_flight.ado(
+        (url, max_chars), lambda: _afetch_page_text(session, url, max_chars)
+    )
+
+
+async def _afetch_page_text(session, url, max_chars):
+    # Text is extracted while the page streams in, and the download stops
+    # once there is enough of it (see core.web_fetch.read_html)
+    extractor = TextExtractor(max_chars)
+    # A recording keeps the page up to the byte cap, not just this call's
+    # max_chars, so replays with a larger max_chars match a live run
+    until = None if replay_mode() == "record" else extractor.feed
+
+    async def get():
+        async with (session or get_session()).get(url, headers=HEADERS) as resp:
+            return await read_html(resp, until=until)
+
+    try:
+        html = await areplayed("fetch", {"url": url}, get)
+        if not extractor.consumed:  # replayed, or read whole for a recording
+            extractor.feed(html)
+        return extractor.text()
     except Exception as e:
         print(f"Failed to fetch {url}: {e}")
-        return ""
+        return None
 
 
-def get_hybrid_context(profile, topic, k_local=3, k_web=2):
-    # Local context
-    from core.vector_store import query_doc
+async def aget_hybrid_context(
+    profile,
+    topic,
+    k_local=3,
+    k_web=2,
+    max_tokens=CONTEXT_TOKENS,
+    model="gpt-3.5-turbo",
+):
+    cache, key, context = _cached(
+        profile, "hybrid", [topic], k=(k_local, k_web), tokens=max_tokens, model=model
+    )
+    if context is not None:
+        return context
 
     name = getattr(profile, "name", "") or ""
-    local = query_doc(getattr(profile, "startup_id", None), topic, k=k_local)
-    # Google web context
-    search_query = f"{name} {topic}"
-    urls = google_search(search_query, num_results=k_web)
-    web_texts = [fetch_page_text(url) for url in urls if url]
-    # Combine, truncate if too long
-    context = "\n\n".join(local + web_texts)[:4000]
-    return context or "No local or web info found."
+    # Chroma's embedded client is synchronous; run the query on a worker thread
+    # while the web fetches run on the shared fetch loop.
+    (local, local_ok), (web_texts, complete) = await asyncio.gather(
+        asyncio.to_thread(_local, getattr(profile, "startup_id", None), topic, k_local),
+        arun(_web_texts(name, [topic], k_web, agoogle_search)),
+    )
+    context = _combine([local], web_texts, max_tokens, model)
+    if cache is not None and local_ok and complete:
+        cache.put(key, profile.startup_id, context)
+    return context
+
+
+# ------------------------------------------------------------------
+# Multi-topic context – one deduplicated context for several chains,
+# used by the fused extraction chain.
+# ------------------------------------------------------------------
+def get_multi_topic_context(
+    profile,
+    topics,
+    k_local=3,
+    k_web=2,
+    max_tokens=MULTI_TOPIC_CONTEXT_TOKENS,
+    model="gpt-3.5-turbo",
+):
+    cache, key, context = _cached(
+        profile, "multi", topics, k=(k_local, k_web), tokens=max_tokens, model=model
+    )
+    if context is not None:
+        return context
+
+    name = getattr(profile, "name", "") or ""
+    sid = getattr(profile, "startup_id", None)
+    local_lists, local_ok = _local_many(sid, topics, k_local)
+    web_texts, complete = run(_web_texts(name, topics, k_web, _threaded_search))
+    context = _combine(local_lists, web_texts, max_tokens, model)
+    if cache is not None and local_ok and complete:
+        cache.put(key, sid, context)
+    return context
+
+
+async def aget_multi_topic_context(
+    profile,
+    topics,
+    k_local=3,
+    k_web=2,
+    max_tokens=MULTI_TOPIC_CONTEXT_TOKENS,
+    model="gpt-3.5-turbo",
+):
+    cache, key, context = _cached(
+        profile, "multi", topics, k=(k_local, k_web), tokens=max_tokens, model=model
+    )
+    if context is not None:
+        return context
+
+    name = getattr(profile, "name", "") or ""
+    sid = getattr(profile, "startup_id", None)
+    (local_lists, local_ok), (web_texts, complete) = await asyncio.gather(
+        asyncio.to_thread(_local_many, sid, topics, k_local),
+        arun(_web_texts(name, topics, k_web, agoogle_search)),
+    )
+    context = _combine(local_lists, web_texts, max_tokens, model)
+    if cache is not None and local_ok and complete:
+        cache.put(key, sid, context)
+    return context
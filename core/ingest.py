@@ -0,0 +1,158 @@
+"""
+Deck ingestion into the vector store.
+
+Extracted text is split into slide-sized chunks: one per page (the
+---PAGE BREAK--- markers in joined text), with pages longer than
+CHUNK_TOKENS split further at headings, then at lines. Each chunk is stored
+under a content-derived id with its page number, so query_doc returns the
+slide that answers a question rather than the whole deck.
+
+Ingestion is idempotent: re-ingesting a deck only embeds chunks that are not
+stored yet (in both the vector and the BM25 index) and drops the ones that
+no longer exist, so an unchanged deck costs one id lookup. Writes go to
+Chroma in INGEST_BATCH-sized upserts, and any change retires the startup's
+memoised contexts (core.context_cache).
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from hashlib import sha1
+from pathlib import Path
+from typing import Iterable, List
+
+from core.tokens import count_tokens
+
+PAGE_BREAK = "\n---PAGE BREAK---\n"
+
+CHUNK_TOKENS = int(os.getenv("INGEST_CHUNK_TOKENS", 400))
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", 64))
+
+# Markdown headings, "SECTION TITLES" and "Label:" lines start a new section
+_HEADING = re.compile(r"^(#{1,6}\s+\S.*|[^a-z]{3,60}|[A-Z][^.!?]{0,58}:)$")
+
+
+@dataclass
+class Chunk:
+    text: str
+    page_no: int  # 1-based
+    index: int = 0  # position within the page
+
+
+def _is_heading(line: str) -> bool:
+    line = line.strip()
+    return bool(line) and len(line.split()) <= 8 and bool(_HEADING.match(line))
+
+
+def _pack(pieces: List[str], max_tokens: int, sep: str) -> List[str]:
+    """Greedily join consecutive pieces while they fit in max_tokens."""
+    out, current = [], []
+    for piece in pieces:
+        candidate = sep.join(current + [piece])
+        if current and count_tokens(candidate) > max_tokens:
+            out.append(sep.join(current))
+            current = [piece]
+        else:
+            current.append(piece)
+    if current:
+        out.append(sep.join(current))
+    return out
+
+
+def chunk_page(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """One page as chunks of at most ~max_tokens, split at headings first."""
+    text = text.strip()
+    if not text:
+        return []
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    sections, current = [], []
+    for line in text.splitlines():
+        if current and _is_heading(line):
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    sections.append("\n".join(current))
+
+    chunks = []
+    for section in _pack(sections, max_tokens, "\n"):
+        if count_tokens(section) <= max_tokens:
+            chunks.append(section)
+        else:  # one oversized section: fall back to lines
+            chunks += _pack(section.splitlines(), max_tokens, "\n")
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def chunk_pages(pages: Iterable[tuple], max_tokens: int = CHUNK_TOKENS) -> List[Chunk]:
+    """Chunks for (page_no, text) pairs."""
+    return [
+        Chunk(piece, page_no, i)
+        for page_no, text in pages
+        for i, piece in enumerate(chunk_page(text, max_tokens))
+    ]
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[Chunk]:
+    """Chunks for joined deck text, pages separated by PAGE_BREAK."""
+    return chunk_pages(enumerate(text.split(PAGE_BREAK.strip()), 1), max_tokens)
+
+
+def chunk_id(startup_id: str, source: str, chunk: Chunk) -> str:
+    key = f"{source}\n{chunk.page_no}\n{chunk.index}\n{chunk.text}"
+    return f"{startup_id}:{sha1(key.encode()).hexdigest()[:16]}"
+
+
+def ingest_chunks(startup_id: str, chunks: List[Chunk], source: str) -> int:
+    """
+    Make the store hold exactly `chunks` for (startup_id, source). Returns
+    how many chunks were embedded and written.
+    """
+    from core.vector_store import delete_ids, get_ids, upsert
+
+    ids = [chunk_id(startup_id, source, chunk) for chunk in chunks]
+    stored = get_ids(startup_id, source)
+    stale = stored - set(ids)
+    if stale:
+        delete_ids(sorted(stale))
+
+    new = [(id_, chunk) for id_, chunk in zip(ids, chunks) if id_ not in stored]
+    for start in range(0, len(new), INGEST_BATCH):
+        batch = new[start : start + INGEST_BATCH]
+        upsert(
+            [id_ for id_, _ in batch],
+            [chunk.text for _, chunk in batch],
+            [
+                {
+                    "sid": startup_id,
+                    "source": source,
+                    "page": chunk.page_no,
+                    "chunk": chunk.index,
+                }
+                for _, chunk in batch
+            ],
+        )
+    if stale or new:
+        from core.context_cache import get_context_cache
+
+        cache = get_context_cache()
+        if cache is not None:  # contexts built from the old chunks are stale
+            cache.bump(startup_id)
+    return len(new)
+
+
+def ingest_text(startup_id: str, text: str, source: str = "text") -> int:
+    return ingest_chunks(startup_id, chunk_text(text), source)
+
+
+def ingest_pdf(startup_id: str, pdf_path: str) -> int:
+    """Chunk and index every page of a deck (text comes via the text cache)."""
+    from core.pdf_extract import iter_pages
+
+    pages = []
+    for page in iter_pages(pdf_path):
+        if page.error:
+            print(f"Warning: page {page.page_no} not indexed: {page.error}")
+        else:
+            pages.append((page.page_no, page.text))
+    return ingest_chunks(startup_id, chunk_pages(pages), Path(pdf_path).name)
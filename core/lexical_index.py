@@ -0,0 +1,121 @@
+"""
+BM25 side index of deck chunks, kept next to the Chroma collection.
+
+core.vector_store writes every chunk here as well (SQLite FTS5, same ids),
+and query_topics runs each topic against both indexes and fuses the two
+rankings. The chains' topics are keyword lists ("founder OR CEO OR
+linkedin"), which BM25 matches directly; when the lexical hits are clearly
+on topic – at least k of them, each matching LEXICAL_MIN_TERMS of the
+topic's words – the vector search (and its embedding call) is skipped.
+
+LEXICAL_INDEX_PATH moves the index (default: lexical.sqlite in
+CHROMA_DB_DIR). With a Chroma server the index is only kept when that path
+is set, to a file every worker shares.
+"""
+
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Hits must match this many distinct topic words (or all, if fewer) to count
+# as confident
+LEXICAL_MIN_TERMS = int(os.getenv("LEXICAL_MIN_TERMS", 2))
+
+# Reciprocal-rank-fusion constant (the usual 60)
+RRF_K = 60
+
+_WORD = re.compile(r"\w+")
+_OPERATORS = {"or", "and", "not", "near"}
+
+
+def query_terms(topic: str) -> List[str]:
+    """Distinct lower-case words of a topic, FTS operators dropped."""
+    words = (w.lower() for w in _WORD.findall(topic))
+    return list(dict.fromkeys(w for w in words if w not in _OPERATORS))
+
+
+class LexicalIndex:
+    """FTS5 table of (id, sid, source, text); one short-lived connection per call."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+                    id UNINDEXED, sid UNINDEXED, source UNINDEXED, text,
+                    tokenize='unicode61')""")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def upsert(
+        self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[dict]
+    ):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM chunks WHERE id=?", [(i,) for i in ids])
+            conn.executemany(
+                "INSERT INTO chunks VALUES (?, ?, ?, ?)",
+                [
+                    (i, meta.get("sid"), meta.get("source"), text)
+                    for i, text, meta in zip(ids, texts, metadatas)
+                ],
+            )
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM chunks WHERE id=?", [(i,) for i in ids])
+
+    def ids(self, sid: str, source: Optional[str] = None) -> set:
+        sql, args = "SELECT id FROM chunks WHERE sid=?", [sid]
+        if source is not None:
+            sql, args = sql + " AND source=?", args + [source]
+        with self._connect() as conn:
+            return {row[0] for row in conn.execute(sql, args)}
+
+    def search(self, sid: str, topic: str, k: int) -> List[Tuple[str, str, float]]:
+        """Top-k (id, text, score) for `topic` within one startup; higher is better."""
+        terms = query_terms(topic)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT id, text, bm25(chunks) FROM chunks
+                WHERE chunks MATCH ? AND sid=? ORDER BY bm25(chunks) LIMIT ?""",
+                (match, sid, k),
+            ).fetchall()
+        return [(id_, text, -score) for id_, text, score in rows]
+
+
+def confident(topic: str, hits: List[Tuple[str, str, float]], k: int) -> bool:
+    """True when `hits` alone answer the topic (see the module docstring)."""
+    terms = query_terms(topic)
+    need = min(LEXICAL_MIN_TERMS, len(terms))
+    if not terms or len(hits) < k:
+        return False
+    for _, text, _ in hits[:k]:
+        words = {w.lower() for w in _WORD.findall(text)}
+        if sum(term in words for term in terms) < need:
+            return False
+    return True
+
+
+def fuse(*rankings: List[Tuple[str, str]], k: int) -> List[str]:
+    """Texts of the top k ids by reciprocal-rank fusion of (id, text) rankings."""
+    scores: Dict[str, float] = {}
+    texts: Dict[str, str] = {}
+    for ranking in rankings:
+        for rank, (id_, text) in enumerate(ranking):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (RRF_K + rank + 1)
+            texts[id_] = text
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [texts[id_] for id_ in best]
@@ -1,9 +1,124 @@
 # core/llm_utils.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
 import time
 import re
-from typing import Any
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
 from openai import RateLimitError  # Correct import
 from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessage, convert_to_messages
+from langchain_core.prompt_values import PromptValue
+
+from core.rate_limit import get_limiter
+from core.singleflight import SingleFlight
+from core.tokens import count_message_tokens
+
+# ------------------------------------------------------------------
+# Client registry
+# ------------------------------------------------------------------
+# One keep-alive connection pool per process (and per event loop for async
+# calls), shared by every chat model, so TLS handshakes are paid once
+# instead of once per chain / agent / call.
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", 64)),
+    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", 32)),
+    keepalive_expiry=60,
+)
+HTTP_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+
+class _PerLoopAsyncClient(httpx.AsyncClient):
+    """
+    AsyncClient that sends on a pool owned by the running event loop.
+
+    httpx connections are bound to the loop that opened them, so one shared
+    pool fails on the next asyncio.run(). Each loop gets its own client
+    instead, dropped once that loop is closed.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._kwargs = kwargs
+        self._pools: Dict[int, tuple] = {}
+        self._pools_lock = threading.Lock()
+
+    def pool(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            for key, (ref, _) in list(self._pools.items()):
+                if ref() is None or ref().is_closed():
+                    del self._pools[key]
+            if id(loop) not in self._pools:
+                client = httpx.AsyncClient(**self._kwargs)
+                self._pools[id(loop)] = (weakref.ref(loop), client)
+            return self._pools[id(loop)][1]
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self.pool().send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        client = self.pool()
+        with self._pools_lock:
+            self._pools.pop(id(asyncio.get_running_loop()), None)
+        await client.aclose()
+
+
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[_PerLoopAsyncClient] = None
+_chat_models: Dict[tuple, ChatOpenAI] = {}
+_registry_lock = threading.Lock()
+
+
+def _http_clients():
+    global _http_client, _http_async_client
+    if _http_client is None:
+        _http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        _http_async_client = _PerLoopAsyncClient(
+            limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT
+        )
+    return _http_client, _http_async_client
+
+
+def get_chat_model(
+    model: str = "gpt-3.5-turbo", temperature: Optional[float] = 0.2
+) -> ChatOpenAI:
+    """
+    Process-wide ChatOpenAI for (model, temperature), built on the shared
+    sync/async connection pools. Pass temperature=None to keep the model's
+    own default (e.g. for o1 models).
+    """
+    key = (model, temperature)
+    with _registry_lock:
+        if key not in _chat_models:
+            http_client, http_async_client = _http_clients()
+            kwargs = {} if temperature is None else {"temperature": temperature}
+            _chat_models[key] = ChatOpenAI(
+                model=model,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **kwargs,
+            )
+        return _chat_models[key]
+
+
+# ------------------------------------------------------------------
+# Response cache
+# ------------------------------------------------------------------
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))  # seconds
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 20000))
+
+# Completion tokens budgeted per call when the model has no max_tokens set
+DEFAULT_COMPLETION_TOKENS = 512
 
 
 def _strip_fences(text: str) -> str:
@@ -13,6 +128,199 @@ def _strip_fences(text: str) -> str:
     return text
 
 
+def _messages(prompt) -> List[dict]:
+    """Normalise a str / PromptValue / message list into plain role+content."""
+    if isinstance(prompt, str):
+        msgs = convert_to_messages([("human", prompt)])
+    elif isinstance(prompt, PromptValue):
+        msgs = prompt.to_messages()
+    else:
+        msgs = convert_to_messages(prompt)
+    return [{"role": m.type, "content": m.content} for m in msgs]
+
+
+def cache_key(model: str, temperature, messages: List[dict]) -> str:
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    Content-addressed response cache in SQLite. Entries expire after `ttl`
+    seconds; past `max_entries` the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: float = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY, model TEXT, content TEXT,
+                    created REAL, last_used REAL)""")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_used)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content, created FROM responses WHERE key=?", (key,)
+            ).fetchone()
+            if row and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key=?", (key,))
+                row = None
+            if row:
+                conn.execute("UPDATE responses SET last_used=? WHERE key=?", (now, key))
+        self._count(row is not None)
+        return row[0] if row else None
+
+    def put(self, key: str, model: str, content: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now),
+            )
+            conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_used DESC
+                    LIMIT -1 OFFSET ?)""",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+_cache: Optional[LLMCache] = None
+llm_flight = SingleFlight("llm")
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """Process-wide LLMCache, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def cache_bypassed(bypass: Optional[bool] = None) -> bool:
+    """An explicit `bypass` wins; otherwise LLM_CACHE_BYPASS decides."""
+    if bypass is not None:
+        return bypass
+    return os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+
+def _lookup(llm, messages, bypass):
+    """
+    Return (key, cached_content). The key is also the single-flight key, so
+    it is computed even when the cache itself is bypassed.
+    """
+    key = cache_key(llm.model_name, llm.temperature, messages)
+    if cache_bypassed(bypass):
+        return key, None
+    return key, get_cache().get(key)
+
+
+def estimate_tokens(llm, messages) -> int:
+    """Prompt tokens plus the completion budget, for rate limiting."""
+    completion = llm.max_tokens or DEFAULT_COMPLETION_TOKENS
+    contents = [str(m["content"]) for m in messages]
+    return count_message_tokens(contents, llm.model_name) + completion
+
+
+def _settle(llm, estimate, resp) -> None:
+    usage = getattr(resp, "usage_metadata", None) or {}
+    limiter = get_limiter()
+    if limiter is not None and usage.get("total_tokens"):
+        limiter.settle(llm.model_name, estimate, usage["total_tokens"])
+
+
+def cached_invoke(llm, prompt, *, bypass: Optional[bool] = None) -> AIMessage:
+    """
+    The single entry point for LLM calls: `llm.invoke(prompt)` behind the
+    response cache, single-flight coalescing and the rate limiter. Set
+    `bypass=True` (or LLM_CACHE_BYPASS=1) to skip the cache.
+    """
+    messages = _messages(prompt)
+    key, content = _lookup(llm, messages, bypass)
+    if content is not None:
+        return AIMessage(content=content)
+
+    def _call():
+        estimate = estimate_tokens(llm, messages)
+        limiter = get_limiter()
+        if limiter is not None:
+            limiter.acquire(llm.model_name, estimate)
+        resp = llm.invoke(prompt)
+        _settle(llm, estimate, resp)
+        if not cache_bypassed(bypass):
+            get_cache().put(key, llm.model_name, resp.content)
+        return resp
+
+    return llm_flight.do(key, _call)
+
+
+async def acached_invoke(llm, prompt, *, bypass: Optional[bool] = None) -> AIMessage:
+    """Awaitable cached_invoke, built on `llm.ainvoke`."""
+    messages = _messages(prompt)
+    key, content = _lookup(llm, messages, bypass)
+    if content is not None:
+        return AIMessage(content=content)
+
+    async def _call():
+        estimate = estimate_tokens(llm, messages)
+        limiter = get_limiter()
+        if limiter is not None:
+            await limiter.aacquire(llm.model_name, estimate)
+        resp = await llm.ainvoke(prompt)
+        _settle(llm, estimate, resp)
+        if not cache_bypassed(bypass):
+            get_cache().put(key, llm.model_name, resp.content)
+        return resp
+
+    return await llm_flight.ado(key, _call)
+
+
 def invoke_with_fallback(
     prompt: str,
     *,
@@ -30,8 +338,8 @@ def invoke_with_fallback(
     # Try primary with retry
     for i in range(retries):
         try:
-            llm = ChatOpenAI(model=primary_model, temperature=temperature)
-            return llm.invoke(prompt)
+            llm = get_chat_model(primary_model, temperature)
+            return cached_invoke(llm, prompt)
         except RateLimitError:
             wait = backoff**i
             print(f"[Rate-limit on {primary_model}, retrying in {wait}s…]")
@@ -47,5 +355,5 @@ def invoke_with_fallback(
 
     # Final fallback attempt
     print(f"[Falling back to {fallback_model}]")
-    llm = ChatOpenAI(model=fallback_model, temperature=temperature)
-    return llm.invoke(prompt)
+    llm = get_chat_model(fallback_model, temperature)
+    return cached_invoke(llm, prompt)
@@ -0,0 +1,136 @@
+"""
+OCR backends for image-only PDF pages.
+
+Pages with a text layer never come here; core.pdf_extract only sends the
+pages pdfplumber finds no text on, rendered to PNG, in batches. OCR_BACKEND
+picks the engine:
+
+    tesseract  local, via pytesseract (default; needs the tesseract binary,
+               e.g. apt install tesseract-ocr)
+    vision     Google Cloud Vision; the client is created on first use,
+               from GOOGLE_APPLICATION_CREDENTIALS or ./cloud-credentials.json
+    stub       returns a fixed string, for tests and benchmarks
+    none       leave image-only pages empty
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Pages rendered per OCR batch, and the resolution they are rendered at
+OCR_BATCH = int(os.getenv("OCR_BATCH", 8))
+OCR_DPI = int(os.getenv("OCR_DPI", 200))
+OCR_THREADS = int(os.getenv("OCR_THREADS", 4))
+
+
+class OCRBackend(ABC):
+    """Turns a batch of PNG page images into text, one string per image."""
+
+    name = "base"
+
+    @abstractmethod
+    def ocr_images(self, images: List[bytes]) -> List[str]: ...
+
+
+class StubBackend(OCRBackend):
+    name = "stub"
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.calls: List[int] = []  # batch sizes seen
+
+    def ocr_images(self, images: List[bytes]) -> List[str]:
+        self.calls.append(len(images))
+        return [self.text for _ in images]
+
+
+class TesseractBackend(OCRBackend):
+    name = "tesseract"
+
+    def __init__(self, lang: str = os.getenv("OCR_LANG", "eng")):
+        import pytesseract  # optional dependency
+
+        pytesseract.get_tesseract_version()  # fails fast without the binary
+        self.pytesseract = pytesseract
+        self.lang = lang
+
+    def _one(self, image: bytes) -> str:
+        from io import BytesIO
+
+        from PIL import Image
+
+        with Image.open(BytesIO(image)) as img:
+            return self.pytesseract.image_to_string(img, lang=self.lang)
+
+    def ocr_images(self, images: List[bytes]) -> List[str]:
+        # tesseract runs as a subprocess, so threads give real parallelism
+        with ThreadPoolExecutor(max_workers=OCR_THREADS) as pool:
+            return list(pool.map(self._one, images))
+
+
+class GoogleVisionBackend(OCRBackend):
+    name = "vision"
+
+    # Vision accepts at most 16 images per batch_annotate_images request
+    REQUEST_LIMIT = 16
+
+    def __init__(self, creds_path: Optional[str] = None):
+        from google.cloud import vision  # optional dependency
+
+        creds_path = creds_path or os.getenv(
+            "GOOGLE_APPLICATION_CREDENTIALS",
+            os.path.join(os.getcwd(), "cloud-credentials.json"),
+        )
+        self.vision = vision
+        self.client = vision.ImageAnnotatorClient.from_service_account_file(creds_path)
+
+    def ocr_images(self, images: List[bytes]) -> List[str]:
+        texts = []
+        for i in range(0, len(images), self.REQUEST_LIMIT):
+            requests = [
+                self.vision.AnnotateImageRequest(
+                    image=self.vision.Image(content=image),
+                    features=[
+                        self.vision.Feature(
+                            type_=self.vision.Feature.Type.DOCUMENT_TEXT_DETECTION
+                        )
+                    ],
+                )
+                for image in images[i : i + self.REQUEST_LIMIT]
+            ]
+            resp = self.client.batch_annotate_images(requests=requests)
+            texts += [r.full_text_annotation.text for r in resp.responses]
+        return texts
+
+
+BACKENDS = {
+    "tesseract": TesseractBackend,
+    "vision": GoogleVisionBackend,
+    "stub": StubBackend,
+}
+
+_backends: Dict[str, Optional[OCRBackend]] = {}
+_backends_lock = threading.Lock()
+
+
+def backend_name() -> str:
+    return os.getenv("OCR_BACKEND", "tesseract").lower()
+
+
+def get_ocr_backend() -> Optional[OCRBackend]:
+    """The OCR_BACKEND engine for this process (None if off or unavailable)."""
+    name = backend_name()
+    with _backends_lock:
+        if name not in _backends:
+            backend = None
+            if name in BACKENDS:
+                try:
+                    backend = BACKENDS[name]()
+                except Exception as e:
+                    print(f"[OCR backend {name} unavailable ({e}); skipping OCR]")
+            elif name != "none":
+                print(f"[Unknown OCR_BACKEND {name!r}; skipping OCR]")
+            _backends[name] = backend
+        return _backends[name]
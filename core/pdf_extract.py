@@ -0,0 +1,259 @@
+"""
+Page-level PDF text extraction on a process pool.
+
+pdfplumber is pure Python and CPU-bound, so long data-room PDFs are split
+into page ranges that worker processes extract side by side. Results come
+back as one PageText (doc, page_no, text) per page, in page order; a page
+that fails to parse carries its error instead of taking the rest of the
+document with it.
+
+Pages without a text layer that carry images (scanned slides) are rendered
+and sent, in batches, to the OCR backend chosen by OCR_BACKEND (see
+core.ocr); OCR runs inside the extraction workers, so it is spread across
+them too. Pages with real text never pay for OCR.
+
+iter_pages / aiter_pages stream those records with only a few page ranges
+in flight, so memory stays flat on large uploads, the first pages arrive
+before the last are parsed, and a consumer whose budget is full can simply
+stop iterating.
+
+The pool is created on first use and shared by every caller in the process
+(CLI runs and API requests alike); shutdown_pool() releases it. Extracted
+text is kept in core.text_cache, so a known deck is never parsed twice.
+"""
+
+import asyncio
+import io
+import itertools
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Union
+
+import pdfplumber
+
+from core.ocr import OCR_BATCH, OCR_DPI, get_ocr_backend
+from core.text_cache import doc_hash, get_text_cache
+
+# Text-cache key component: bump whenever extraction output changes
+EXTRACTOR_VERSION = f"pdfplumber-{pdfplumber.__version__}/1"
+
+EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 8))
+
+# Below this many pages the pool's overhead outweighs the win
+MIN_PARALLEL_PAGES = 16
+
+
+@dataclass
+class PageText:
+    doc: str  # the PDF's path
+    page_no: int  # 1-based
+    text: str
+    error: Optional[str] = None
+    ocr: bool = False  # text came from the OCR backend
+    # Rendered page awaiting OCR; only set while a batch is being collected
+    image: Optional[bytes] = field(default=None, repr=False, compare=False)
+
+
+def page_count(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _render(page) -> bytes:
+    buf = io.BytesIO()
+    page.to_image(resolution=OCR_DPI).original.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _iter_serial(
+    path: str, start: int = 0, stop: Optional[int] = None, ocr: bool = False
+):
+    with pdfplumber.open(path) as pdf:
+        end = len(pdf.pages) if stop is None else min(stop, len(pdf.pages))
+        for i in range(start, end):
+            page = pdf.pages[i]
+            try:
+                record = PageText(path, i + 1, page.extract_text() or "")
+                if ocr and not record.text.strip() and page.images:
+                    record.image = _render(page)
+            except Exception as e:
+                record = PageText(path, i + 1, "", f"{type(e).__name__}: {e}")
+            finally:
+                page.close()  # drop the page's parsed objects
+            yield record
+
+
+def _ocr_batch(pages: List[PageText], backend) -> List[PageText]:
+    todo = [page for page in pages if page.image is not None]
+    if todo:
+        try:
+            texts = backend.ocr_images([page.image for page in todo])
+            for page, text in zip(todo, texts):
+                page.text, page.ocr = text, True
+        except Exception as e:
+            for page in todo:
+                page.error = f"OCR failed: {type(e).__name__}: {e}"
+        for page in todo:
+            page.image = None
+    return pages
+
+
+def _with_ocr(pages: Iterable[PageText], backend) -> Iterator[PageText]:
+    """OCR image-only pages in batches of OCR_BATCH, keeping page order."""
+    held, waiting = [], 0
+    for page in pages:
+        if not held and page.image is None:
+            yield page
+            continue
+        held.append(page)
+        waiting += page.image is not None
+        if waiting >= OCR_BATCH:
+            yield from _ocr_batch(held, backend)
+            held, waiting = [], 0
+    yield from _ocr_batch(held, backend)
+
+
+def _parse(path: str, start: int = 0, stop: Optional[int] = None):
+    backend = get_ocr_backend()
+    pages = _iter_serial(path, start, stop, ocr=backend is not None)
+    return _with_ocr(pages, backend) if backend is not None else pages
+
+
+def extract_range(path: str, start: int, stop: int) -> List[PageText]:
+    """Extract pages [start, stop) (0-based) of one PDF, isolating page errors."""
+    return list(_parse(path, start, stop))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[Executor]:
+    """Process-wide extraction pool, or None when parallelism is off."""
+    global _pool
+    if EXTRACT_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Never fork: callers may hold threads (API server, chroma, httpx)
+            method = "forkserver" if os.name == "posix" else "spawn"
+            _pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _ranges(n_pages: int, first: int = 0) -> List[tuple]:
+    return [
+        (start, min(start + PAGES_PER_TASK, n_pages))
+        for start in range(first, n_pages, PAGES_PER_TASK)
+    ]
+
+
+def _broken() -> None:
+    print("[pdf extraction pool broke; extracting in-process]")
+    shutdown_pool()
+
+
+def _extract_doc(path: str, first: int = 0) -> Iterator[PageText]:
+    """Parse pages first.. of `path`, on the pool when worthwhile."""
+    n_pages = page_count(path)
+    pool = get_pool() if n_pages - first >= MIN_PARALLEL_PAGES else None
+    if pool is None:
+        yield from _parse(path, first)
+        return
+
+    ranges = iter(_ranges(n_pages, first))
+    window = deque(
+        pool.submit(extract_range, path, *r)
+        for r in itertools.islice(ranges, 2 * EXTRACT_WORKERS)
+    )
+    done = first
+    try:
+        while window:
+            try:
+                pages = window.popleft().result()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    window.append(pool.submit(extract_range, path, *next_range))
+            except BrokenProcessPool:
+                _broken()
+                yield from _parse(path, done)
+                return
+            done += len(pages)
+            yield from pages
+    finally:
+        for future in window:  # consumer stopped early
+            future.cancel()
+
+
+def _extractor_key() -> str:
+    backend = get_ocr_backend()
+    return f"{EXTRACTOR_VERSION}+ocr:{backend.name if backend else 'none'}"
+
+
+def _iter_doc(path: str) -> Iterator[PageText]:
+    """Cached pages of `path` first, then whatever still needs parsing."""
+    cache = get_text_cache()
+    if cache is None:
+        yield from _extract_doc(path)
+        return
+    key, extractor = doc_hash(path), _extractor_key()
+    cached, complete = cache.get(key, extractor)
+    for page_no, text in cached:
+        yield PageText(path, page_no, text)
+    if complete:
+        return
+
+    pages, clean, finished = list(cached), True, False
+    try:
+        for page in _extract_doc(path, len(cached)):
+            clean = clean and page.error is None
+            if clean:
+                pages.append((page.page_no, page.text))
+            yield page
+        finished = True
+    finally:
+        # Keep the clean leading pages even if the reader stopped early
+        if len(pages) > len(cached) or (finished and clean):
+            cache.put(key, extractor, pages, finished and clean)
+
+
+def iter_pages(paths: Union[str, Iterable[str]]) -> Iterator[PageText]:
+    """Stream every page of one or more PDFs, in document and page order."""
+    for path in [paths] if isinstance(paths, str) else paths:
+        yield from _iter_doc(path)
+
+
+async def aiter_pages(paths: Union[str, Iterable[str]]) -> AsyncIterator[PageText]:
+    """Async iter_pages; parsing never runs on the event loop."""
+    pages = iter_pages(paths)
+    try:
+        while (page := await asyncio.to_thread(next, pages, None)) is not None:
+            yield page
+    finally:
+        await asyncio.to_thread(pages.close)
+
+
+def extract_pages(path: str) -> List[PageText]:
+    """Every page of `path`, in order, extracted in parallel when worthwhile."""
+    return list(iter_pages(path))
+
+
+async def aextract_pages(path: str) -> List[PageText]:
+    return [page async for page in aiter_pages(path)]
@@ -0,0 +1,172 @@
+"""
+Dependency-graph executor for the analysis chains.
+
+Every stage declares the StartupProfile fields it reads and writes. A stage
+waits only for earlier stages that write something it reads (or that write
+the same field), so independent chains run side by side on a thread pool.
+Each stage works on its own snapshot of the profile; only the fields it
+declares as writes are merged back, on the coordinating thread, so parallel
+stages can never clobber each other.
+
+arun_pipeline does the same on an event loop, using each stage's `afn`.
+
+Both accept an optional checkpoint (see core.checkpoint). A stage whose
+inputs were themselves restored and whose output is on record is merged
+from the checkpoint instead of being run, so a rerun resumes at the first
+missing stage and re-runs everything downstream of it.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from core.schemas import StartupProfile
+
+# Convenience for stages that consume the whole profile (e.g. risk assessment)
+ALL_FIELDS = tuple(StartupProfile.model_fields)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable[[StartupProfile], StartupProfile]
+    reads: Sequence[str] = ()
+    writes: Sequence[str] = ()
+    afn: Optional[Callable[[StartupProfile], Awaitable[StartupProfile]]] = None
+    # Part of the checkpoint key; bump (or hash the prompt) when output changes
+    version: str = ""
+
+
+def stage_dependencies(stages: Iterable[Stage]) -> Dict[str, Set[str]]:
+    """Map each stage name to the names of the earlier stages it must wait for."""
+    stages = list(stages)
+    deps: Dict[str, Set[str]] = {}
+    for i, stage in enumerate(stages):
+        needs = set(stage.reads) | set(stage.writes)
+        deps[stage.name] = {
+            earlier.name for earlier in stages[:i] if needs & set(earlier.writes)
+        }
+    return deps
+
+
+def _merge(profile: StartupProfile, result: StartupProfile, fields: Sequence[str]):
+    for field in fields:
+        setattr(profile, field, getattr(result, field))
+
+
+def _next_stages(profile, pending, deps, done, restored, checkpoint) -> List[Stage]:
+    """
+    Pop every pending stage whose dependencies are done. Stages that can be
+    restored from the checkpoint are merged straight away (which may unblock
+    more stages); the rest are returned to be run.
+    """
+    to_run = []
+    progressed = True
+    while progressed:
+        progressed = False
+        for name, stage in list(pending.items()):
+            if not deps[name] <= done:
+                continue
+            del pending[name]
+            saved = None
+            if checkpoint is not None and deps[name] <= restored:
+                saved = checkpoint.load(stage)
+            if saved is None:
+                to_run.append(stage)
+                continue
+            _merge(profile, StartupProfile.model_validate(saved), stage.writes)
+            done.add(name)
+            restored.add(name)
+            progressed = True
+    return to_run
+
+
+def _finish(profile, stage, result, done, checkpoint):
+    _merge(profile, result, stage.writes)
+    done.add(stage.name)
+    if checkpoint is not None:
+        checkpoint.save(
+            stage, result.model_dump(mode="json", include=set(stage.writes))
+        )
+
+
+def run_pipeline(
+    profile: StartupProfile,
+    stages: List[Stage],
+    max_workers: Optional[int] = None,
+    checkpoint=None,
+) -> StartupProfile:
+    """
+    Run `stages` against `profile`, in parallel wherever the declared
+    reads/writes allow it. Returns the same profile object, updated in place.
+    The first stage exception is re-raised once the running stages finish.
+    """
+    if not stages:
+        return profile
+
+    deps = stage_dependencies(stages)
+    pending = {stage.name: stage for stage in stages}
+    done: Set[str] = set()
+    restored: Set[str] = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages)) as pool:
+        while pending or running:
+            for stage in _next_stages(
+                profile, pending, deps, done, restored, checkpoint
+            ):
+                snapshot = profile.model_copy(deep=True)
+                # Like asyncio tasks, stages see the caller's context variables
+                ctx = contextvars.copy_context()
+                running[pool.submit(ctx.run, stage.fn, snapshot)] = stage
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                _finish(profile, stage, future.result(), done, checkpoint)
+
+    return profile
+
+
+async def arun_pipeline(
+    profile: StartupProfile, stages: List[Stage], checkpoint=None
+) -> StartupProfile:
+    """
+    Awaitable run_pipeline. Stages without an `afn` fall back to running
+    their sync `fn` on a worker thread.
+    """
+    deps = stage_dependencies(stages)
+    pending = {stage.name: stage for stage in stages}
+    done: Set[str] = set()
+    restored: Set[str] = set()
+    running = {}
+
+    try:
+        while pending or running:
+            for stage in _next_stages(
+                profile, pending, deps, done, restored, checkpoint
+            ):
+                snapshot = profile.model_copy(deep=True)
+                if stage.afn is not None:
+                    coro = stage.afn(snapshot)
+                else:
+                    coro = asyncio.to_thread(stage.fn, snapshot)
+                running[asyncio.ensure_future(coro)] = stage
+            if not running:
+                continue
+
+            finished, _ = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in finished:
+                stage = running.pop(task)
+                _finish(profile, stage, task.result(), done, checkpoint)
+    finally:
+        for task in running:
+            task.cancel()
+
+    return profile
@@ -0,0 +1,144 @@
+"""
+Client-side token-bucket rate limiter for LLM calls.
+
+Each model has two buckets, requests-per-minute and tokens-per-minute. The
+bucket levels live in a small SQLite file and are updated inside an
+exclusive transaction, so every worker process on the machine draws from
+the same budget. A call is admitted only once both buckets can cover it;
+otherwise the caller sleeps just long enough for the buckets to refill,
+instead of hammering the API and backing off in lockstep on 429s.
+
+Limits come from DEFAULT_LIMITS, overridable with LLM_RATE_LIMITS, e.g.
+    LLM_RATE_LIMITS='{"gpt-4": {"rpm": 500, "tpm": 30000}}'
+Models without limits are never throttled. LLM_RATE_LIMIT_DISABLED=1 turns
+the limiter off.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+LIMITER_PATH = os.getenv("LLM_RATE_LIMIT_PATH", ".cache/rate_limit.sqlite")
+
+# Conservative per-model budgets (requests / tokens per minute)
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "gpt-3.5-turbo": {"rpm": 3500, "tpm": 200000},
+    "gpt-4o-mini": {"rpm": 5000, "tpm": 200000},
+    "gpt-4": {"rpm": 500, "tpm": 10000},
+    "gpt-4-turbo-preview": {"rpm": 500, "tpm": 30000},
+    "o1-mini": {"rpm": 500, "tpm": 200000},
+}
+
+
+def _load_limits() -> Dict[str, Dict[str, float]]:
+    limits = {model: dict(lim) for model, lim in DEFAULT_LIMITS.items()}
+    override = os.getenv("LLM_RATE_LIMITS")
+    if override:
+        for model, lim in json.loads(override).items():
+            limits.setdefault(model, {}).update(lim)
+    return limits
+
+
+class RateLimiter:
+    """Cross-process RPM + TPM token bucket, one row per model."""
+
+    def __init__(self, path: str = LIMITER_PATH, limits=None):
+        self.path = Path(path)
+        self.limits = _load_limits() if limits is None else limits
+        self.waited = 0.0  # seconds this process spent throttled
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS buckets (
+                    model TEXT PRIMARY KEY, requests REAL, tokens REAL,
+                    updated REAL)""")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _try_acquire(self, model: str, tokens: float) -> float:
+        """
+        Take one request and `tokens` from the model's buckets if both can
+        cover it and return 0; otherwise return the seconds to wait.
+        """
+        lim = self.limits.get(model)
+        if not lim:
+            return 0.0
+        rpm, tpm = lim.get("rpm", float("inf")), lim.get("tpm", float("inf"))
+        tokens = min(tokens, tpm)  # an oversize call still gets through, alone
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # exclusive across processes
+            try:
+                row = conn.execute(
+                    "SELECT requests, tokens, updated FROM buckets WHERE model=?",
+                    (model,),
+                ).fetchone()
+                req_level, tok_level, updated = row or (rpm, tpm, now)
+                elapsed = max(0.0, now - updated)
+                req_level = min(rpm, req_level + elapsed * rpm / 60)
+                tok_level = min(tpm, tok_level + elapsed * tpm / 60)
+
+                wait = 0.0
+                if req_level < 1:
+                    wait = max(wait, (1 - req_level) * 60 / rpm)
+                if tok_level < tokens:
+                    wait = max(wait, (tokens - tok_level) * 60 / tpm)
+                if wait == 0.0:
+                    req_level -= 1
+                    tok_level -= tokens
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                    (model, req_level, tok_level, now),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self, model: str, tokens: float) -> None:
+        """Block until the call fits in the model's budget."""
+        while (wait := self._try_acquire(model, tokens)) > 0:
+            self.waited += wait
+            time.sleep(wait)
+
+    async def aacquire(self, model: str, tokens: float) -> None:
+        while (wait := await asyncio.to_thread(self._try_acquire, model, tokens)) > 0:
+            self.waited += wait
+            await asyncio.sleep(wait)
+
+    def settle(self, model: str, estimated: float, actual: float) -> None:
+        """Correct the token bucket once the real usage is known."""
+        if model not in self.limits or actual == estimated:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE buckets SET tokens = tokens + ? WHERE model=?",
+                (estimated - actual, model),
+            )
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> Optional[RateLimiter]:
+    """Process-wide RateLimiter, or None when disabled."""
+    global _limiter
+    if os.getenv("LLM_RATE_LIMIT_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -0,0 +1,97 @@
+"""
+Record / replay for the pipeline's external HTTP calls.
+
+REPLAY_MODE=record runs every wrapped call for real and saves its response
+under REPLAY_DIR/<service>/<sha256 of the request>.json; REPLAY_MODE=replay
+serves those files instead of touching the network, optionally after
+REPLAY_LATENCY seconds so timings stay realistic. Anything else (the
+default) leaves calls untouched.
+
+Exa, Google search, page fetches and Proxycurl go through here. LLM calls
+are recorded and replayed by benchmarks.stub_server, an OpenAI-compatible
+server that the clients reach through OPENAI_BASE_URL and that reads the
+same REPLAY_DIR.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+DEFAULT_DIR = "benchmarks/fixtures"
+
+
+class ReplayMiss(LookupError):
+    """Replay mode found no recording for a request."""
+
+
+def replay_mode() -> str:
+    mode = os.getenv("REPLAY_MODE", "").lower()
+    return mode if mode in ("record", "replay") else "off"
+
+
+def replay_dir() -> Path:
+    return Path(os.getenv("REPLAY_DIR", DEFAULT_DIR))
+
+
+def request_key(request: dict) -> str:
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def fixture_path(service: str, request: dict) -> Path:
+    return replay_dir() / service / f"{request_key(request)}.json"
+
+
+def load(service: str, request: dict) -> Any:
+    path = fixture_path(service, request)
+    try:
+        return json.loads(path.read_text())["response"]
+    except FileNotFoundError:
+        raise ReplayMiss(f"no {service} recording for {request}") from None
+
+
+def save(service: str, request: dict, response: Any) -> None:
+    path = fixture_path(service, request)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(
+        json.dumps({"request": request, "response": response}, indent=2, default=str)
+    )
+    tmp.replace(path)  # concurrent recorders never leave a torn file
+
+
+def _latency() -> float:
+    return float(os.getenv("REPLAY_LATENCY", 0))
+
+
+def replayed(service: str, request: dict, fn: Callable[[], Any]) -> Any:
+    """
+    fn() under the current REPLAY_MODE. `request` identifies the call and
+    must be JSON-serialisable; fn's result must be too.
+    """
+    mode = replay_mode()
+    if mode == "replay":
+        time.sleep(_latency())
+        return load(service, request)
+    response = fn()
+    if mode == "record":
+        save(service, request, response)
+    return response
+
+
+async def areplayed(
+    service: str, request: dict, fn: Callable[[], Awaitable[Any]]
+) -> Any:
+    """Awaitable replayed(); fn returns the coroutine to run when live."""
+    mode = replay_mode()
+    if mode == "replay":
+        await asyncio.sleep(_latency())
+        return load(service, request)
+    response = await fn()
+    if mode == "record":
+        await asyncio.to_thread(save, service, request, response)
+    return response
@@ -0,0 +1,89 @@
+"""
+Local (vector store) retrieval shared across one pipeline run.
+
+Every analysis chain asks the vector store about its own topic. Inside
+run_retrieval(topics), the first such lookup for a startup_id fetches all
+of the run's topics in a single batched query and later lookups are served
+from that result, so a deck costs one Chroma round trip (and one embedding
+batch) instead of one per chain. A failed query (RetrievalError) is not
+kept; the next lookup tries again.
+
+The run object lives in a ContextVar: asyncio tasks and asyncio.to_thread
+inherit it, and core.pipeline runs thread-pool stages inside a copy of the
+caller's context. Outside run_retrieval, lookups go straight to the store.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+
+class RunRetrieval:
+    """Per-topic local snippets for one run, fetched in one query per startup."""
+
+    def __init__(self, topics: Iterable[str], k: int = 3):
+        self.topics = list(dict.fromkeys(topics))
+        self.k = k
+        self.queries = 0
+        self._results: Dict[str, Dict[str, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, startup_id: Optional[str], topics: List[str], k: int):
+        from core import vector_store
+
+        if not startup_id:
+            return {topic: [] for topic in topics}
+        if k > self.k:  # deeper than what the run prefetches
+            return vector_store.query_topics(startup_id, topics, k)
+        with self._lock:  # concurrent chains wait for the one batched query
+            results = self._results.setdefault(startup_id, {})
+            if any(topic not in results for topic in topics):
+                missing = [
+                    t for t in dict.fromkeys(self.topics + topics) if t not in results
+                ]
+                self.queries += 1
+                try:
+                    found = vector_store.query_topics(startup_id, missing, self.k)
+                except vector_store.RetrievalError as e:
+                    partial = {t: e.results.get(t, [])[:k] for t in topics}
+                    raise vector_store.RetrievalError(str(e), partial) from e
+                results.update(found)
+        return {topic: results[topic][:k] for topic in topics}
+
+
+_current: ContextVar[Optional[RunRetrieval]] = ContextVar("run_retrieval", default=None)
+
+
+@contextmanager
+def run_retrieval(topics: Iterable[str], k: int = 3):
+    """Serve local lookups made inside the block from one batched query."""
+    run = RunRetrieval(topics, k)
+    token = _current.set(run)
+    try:
+        yield run
+    finally:
+        _current.reset(token)
+
+
+def local_snippets(startup_id: Optional[str], topic: str, k: int = 3) -> List[str]:
+    run = _current.get()
+    if run is None:
+        from core.vector_store import query_doc
+
+        return query_doc(startup_id, topic, k=k)
+    return run.get_many(startup_id, [topic], k)[topic]
+
+
+def local_snippets_many(
+    startup_id: Optional[str], topics: List[str], k: int = 3
+) -> List[List[str]]:
+    """Snippets for each of `topics`, in order, from at most one query."""
+    run = _current.get()
+    if run is None:
+        from core.vector_store import query_topics
+
+        results = query_topics(startup_id, topics, k)
+    else:
+        results = run.get_many(startup_id, topics, k)
+    return [results[topic] for topic in topics]
@@ -0,0 +1,83 @@
+"""
+Single-flight request coalescing.
+
+While a call for some key is in flight, any other caller asking for the
+same key waits for that call and gets its result (or its exception)
+instead of paying for a duplicate request. Nothing is kept once the call
+finishes – that is the caches' job – so this only collapses concurrent
+duplicates, e.g. several decks from the same company arriving together.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0  # underlying calls actually made
+        self.coalesced = 0  # callers that piggy-backed on one of them
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[tuple, asyncio.Future] = {}
+        _groups[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() unless a call for `key` is already running; share its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Awaitable do(); callers on the same event loop share one task."""
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        # Shield so one caller being cancelled doesn't cancel it for the rest
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+def singleflight_stats() -> Dict[str, dict]:
+    """Call / coalesced counters for every SingleFlight group."""
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,176 @@
+"""
+Persistent cache of extracted PDF page text.
+
+Pages are stored under (PDF sha256, extractor version), so a deck that has
+been parsed once – through the CLI or /api/upload – is never parsed again,
+whatever its filename, until the extractor changes. A reader that stopped
+early leaves the leading pages it did read; the next reader gets those from
+the cache and only parses the rest. The cache is bounded by total text
+size; least recently used documents are evicted first.
+
+PDF_TEXT_CACHE_PATH moves it, PDF_TEXT_CACHE_MAX_MB bounds it and
+PDF_TEXT_CACHE_DISABLED=1 turns it off.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.checkpoint import file_sha256
+
+CACHE_PATH = os.getenv("PDF_TEXT_CACHE_PATH", ".cache/pdf_text.sqlite")
+CACHE_MAX_BYTES = int(float(os.getenv("PDF_TEXT_CACHE_MAX_MB", 512)) * 1024**2)
+
+
+class TextCache:
+    """Per-page text by (doc_hash, extractor); LRU-evicted past max_bytes."""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS docs (
+                    doc_hash TEXT, extractor TEXT, bytes INTEGER,
+                    complete INTEGER, last_used REAL,
+                    PRIMARY KEY (doc_hash, extractor))""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+                    doc_hash TEXT, extractor TEXT, page_no INTEGER, text TEXT,
+                    PRIMARY KEY (doc_hash, extractor, page_no))""")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, doc_hash: str, extractor: str) -> Tuple[List[Tuple[int, str]], bool]:
+        """
+        ([(page_no, text), ...] from page 1 in order, complete): every page
+        when complete, otherwise just the leading pages read so far.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT complete FROM docs WHERE doc_hash=? AND extractor=?",
+                (doc_hash, extractor),
+            ).fetchone()
+            pages = []
+            if row:
+                conn.execute(
+                    "UPDATE docs SET last_used=? WHERE doc_hash=? AND extractor=?",
+                    (time.time(), doc_hash, extractor),
+                )
+                pages = conn.execute(
+                    """SELECT page_no, text FROM pages
+                    WHERE doc_hash=? AND extractor=? ORDER BY page_no""",
+                    (doc_hash, extractor),
+                ).fetchall()
+        complete = bool(row and row[0])
+        self._count(complete)
+        return pages, complete
+
+    def put(
+        self,
+        doc_hash: str,
+        extractor: str,
+        pages: List[Tuple[int, str]],
+        complete: bool = True,
+    ) -> None:
+        """Store the leading `pages` of a document (all of them if complete)."""
+        size = sum(len(text.encode()) for _, text in pages)
+        if size > self.max_bytes:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM pages WHERE doc_hash=? AND extractor=?",
+                (doc_hash, extractor),
+            )
+            conn.executemany(
+                "INSERT INTO pages VALUES (?, ?, ?, ?)",
+                [(doc_hash, extractor, no, text) for no, text in pages],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?)",
+                (doc_hash, extractor, size, int(complete), time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn) -> None:
+        (total,) = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM docs").fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT doc_hash, extractor, bytes FROM docs ORDER BY last_used"
+        ).fetchall()
+        for doc_hash, extractor, size in rows:
+            if total <= self.max_bytes:
+                break
+            for table in ("pages", "docs"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE doc_hash=? AND extractor=?",
+                    (doc_hash, extractor),
+                )
+            total -= size
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages")
+            conn.execute("DELETE FROM docs")
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            docs, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM docs"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "docs": docs, "bytes": size}
+
+
+_cache: Optional[TextCache] = None
+_cache_lock = threading.Lock()
+_hashes: Dict[tuple, str] = {}
+
+
+def get_text_cache() -> Optional[TextCache]:
+    """Process-wide TextCache, or None when disabled."""
+    global _cache
+    if os.getenv("PDF_TEXT_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TextCache()
+        return _cache
+
+
+def _stat_key(path: str) -> tuple:
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def remember_hash(path: str, digest: str) -> None:
+    """Record a sha256 already computed elsewhere (e.g. while uploading)."""
+    _hashes[_stat_key(path)] = digest
+
+
+def doc_hash(path: str) -> str:
+    """sha256 of the file, remembered per (path, size, mtime) for this process."""
+    key = _stat_key(path)
+    if key not in _hashes:
+        _hashes[key] = file_sha256(path)
+    return _hashes[key]
@@ -0,0 +1,48 @@
+"""
+Token counting with tiktoken, falling back to a ~4 chars/token estimate
+when the model is unknown or the encoding files can't be loaded (offline).
+"""
+
+from functools import lru_cache
+from typing import Iterable
+
+import tiktoken
+
+# Rough per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"[tiktoken unavailable for {model} ({type(e).__name__}); estimating]")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(contents: Iterable[str], model: str = "gpt-3.5-turbo"):
+    return sum(count_tokens(c, model) + MESSAGE_OVERHEAD for c in contents)
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> str:
+    """The longest prefix of `text` that fits in `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    enc = _encoding(model)
+    if enc is None:
+        return text[: max_tokens * 4]
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
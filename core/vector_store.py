@@ -1,43 +1,292 @@
-from chromadb import Client, Settings
-from pathlib import Path
+"""
+Process-wide handle on the Chroma collection of deck chunks.
+
+Nothing is opened at import time: chromadb is imported, the directory
+created and the collection opened on the first call that needs them (or
+explicitly with open_store / warm_up), so CLI runs and API workers that
+never retrieve don't pay for Chroma at all. close_store() releases it.
+
+Two modes:
+
+    embedded  (default) a persistent client on CHROMA_DB_DIR, for a single
+              process (the CLI, a batch run, one API worker). Chroma keeps
+              its index state in memory per process, so the directory is
+              claimed with a lock file and a second process opening it gets
+              an error instead of stale or corrupt reads.
+    server    with CHROMA_SERVER_URL set (e.g. http://localhost:8000, from
+              `chroma run --path .chroma`), every process talks to one
+              Chroma server – required as soon as more than one process
+              (e.g. several API workers) retrieves.
+
+Every chunk also goes into a BM25 index (core.lexical_index) and queries
+fuse the lexical and vector rankings; topics the lexical index answers
+confidently skip the embedding call altogether. The BM25 index is a local
+SQLite file, so in server mode it is only used when LEXICAL_INDEX_PATH
+points every worker at the same shared file; otherwise retrieval is
+vector-only there.
+"""
+
 import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
 
 # Get the ChromaDB directory from environment variable or use default
 CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", ".chroma")
-ROOT = Path(CHROMA_DB_DIR)
-ROOT.mkdir(exist_ok=True)
+CHROMA_SERVER_URL = os.getenv("CHROMA_SERVER_URL", "")
+COLLECTION = "startup_docs"
+
+
+class RetrievalError(RuntimeError):
+    """A lookup that only partly succeeded; `results` holds what it found."""
+
+    def __init__(self, message: str, results: Dict[str, list]):
+        super().__init__(message)
+        self.results = results
+
+
+# Embedded directories this process has open: path -> [lock file, handles]
+_claims: Dict[Path, list] = {}
+_claims_lock = threading.Lock()
+
+
+def _claim(root: Path) -> None:
+    """Take `root` for this process, or fail if another process has it."""
+    if os.name != "posix":
+        return
+    import fcntl
+
+    with _claims_lock:
+        claim = _claims.get(root)
+        if claim is None:
+            f = open(root / ".owner.lock", "w")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                raise RuntimeError(
+                    f"{root} is open in another process; embedded Chroma is "
+                    "single-process – set CHROMA_SERVER_URL to share one "
+                    "Chroma server between workers"
+                ) from None
+            claim = _claims[root] = [f, 0]
+        claim[1] += 1
+
+
+def _release(root: Path) -> None:
+    with _claims_lock:
+        claim = _claims.get(root)
+        if claim is not None:
+            claim[1] -= 1
+            if claim[1] == 0:
+                claim[0].close()  # drops the flock
+                del _claims[root]
+
+
+class VectorStore:
+    """An open Chroma client and collection; see get_store()."""
+
+    def __init__(self, path: Optional[str] = None, server_url: Optional[str] = None):
+        from chromadb import Client, HttpClient, Settings
+
+        from core.embeddings import collection_name, get_embedding_function
+        from core.lexical_index import LexicalIndex
+
+        server_url = CHROMA_SERVER_URL if server_url is None else server_url
+        self.server_url = server_url
+        self.root = None if server_url else Path(path or CHROMA_DB_DIR).resolve()
+        self._write_lock = threading.Lock()
+        lexical_path = os.getenv("LEXICAL_INDEX_PATH")
+        if not lexical_path and not server_url:
+            lexical_path = Path(path or CHROMA_DB_DIR) / "lexical.sqlite"
+        self.lexical = LexicalIndex(lexical_path) if lexical_path else None
+        settings = Settings(anonymized_telemetry=False, allow_reset=True)
+        if self.root is not None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            _claim(self.root)
+        try:
+            if server_url:
+                url = urlparse(server_url)
+                self.client = HttpClient(
+                    host=url.hostname,
+                    port=url.port or (443 if url.scheme == "https" else 8000),
+                    ssl=url.scheme == "https",
+                    settings=settings,
+                )
+            else:
+                settings.is_persistent = True
+                settings.persist_directory = str(self.root)
+                self.client = Client(settings)
+
+            # Texts are embedded through the vector cache (EMBEDDING_BACKEND
+            # picks the model; see core.embeddings), one collection per model
+            self.embedding_function = get_embedding_function()
+            with self.write_lock():  # creating the collection is a write
+                self.collection = self.client.get_or_create_collection(
+                    name=collection_name(COLLECTION, self.embedding_function),
+                    metadata={"hnsw:space": "cosine"},
+                    embedding_function=self.embedding_function,
+                )
+        except BaseException:
+            if self.root is not None:
+                _release(self.root)  # don't keep the directory from others
+            raise
 
-# Initialize ChromaDB with proper settings
-client = Client(
-    Settings(
-        anonymized_telemetry=False,
-        allow_reset=True,
-        is_persistent=True,
-        persist_directory=str(ROOT),
-    )
-)
+    @contextmanager
+    def write_lock(self):
+        """Serialises this handle's writes to Chroma and the BM25 index."""
+        with self._write_lock:
+            yield
 
-# Create or get the collection with proper configuration
-collection = client.get_or_create_collection(
-    name="startup_docs", metadata={"hnsw:space": "cosine"}
-)
+    def close(self) -> None:
+        close = getattr(self.client, "close", None)  # chromadb >= 1.1
+        if close is not None:
+            close()
+        if self.root is not None:
+            _release(self.root)
+
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> VectorStore:
+    """The process-wide store, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = VectorStore()
+        return _store
+
+
+def open_store() -> VectorStore:
+    """Open the store now (e.g. as a worker starts) instead of on first use."""
+    return get_store()
+
+
+def close_store() -> None:
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
+
+
+def warm_up(topics: Iterable[str] = ()) -> None:
+    """Open the store and load the embedding model (embedding `topics`)."""
+    store = get_store()
+    topics = list(topics)
+    if topics:
+        store.embedding_function(topics)
 
 
 def add_doc(startup_id: str, text: str) -> None:
-    collection.add(
-        documents=[text],
-        ids=[startup_id],
-        metadatas=[{"sid": startup_id}],
-    )
+    """Index `text` for `startup_id` as page/section chunks (see core.ingest)."""
+    from core.ingest import ingest_text
+
+    ingest_text(startup_id, text)
+
+
+def get_ids(startup_id: str, source: Optional[str] = None) -> set:
+    """Ids stored for a startup (and source) in the vector and BM25 index."""
+    store = get_store()
+    where = {"sid": startup_id}
+    if source is not None:
+        where = {"$and": [where, {"source": source}]}
+    ids = set(store.collection.get(where=where, include=[])["ids"])
+    if store.lexical is None:
+        return ids
+    return ids & store.lexical.ids(startup_id, source)
+
+
+def delete_ids(ids: list) -> None:
+    store = get_store()
+    with store.write_lock():
+        store.collection.delete(ids=ids)
+        if store.lexical is not None:
+            store.lexical.delete(ids)
+
+
+def upsert(ids: list, documents: list, metadatas: list) -> None:
+    """Insert or replace documents, split to the server's batch limit."""
+    store = get_store()
+    step = store.client.get_max_batch_size()
+    # Embed before taking the lock, so other writers only wait for the write
+    embeddings = store.embedding_function(documents)
+    with store.write_lock():
+        for i in range(0, len(ids), step):
+            store.collection.upsert(
+                ids=ids[i : i + step],
+                documents=documents[i : i + step],
+                embeddings=embeddings[i : i + step],
+                metadatas=metadatas[i : i + step],
+            )
+        if store.lexical is not None:
+            store.lexical.upsert(ids, documents, metadatas)
 
 
 def query_doc(startup_id: str | None, question: str, k: int = 4):
-    """Return k document snippets, or [] if no id yet."""
-    if not startup_id:  # ← guard against None/empty
-        return []
-    res = collection.query(
-        query_texts=[question],
-        n_results=k,
-        where={"sid": startup_id},
-    )
-    return res["documents"][0] if res["documents"] else []
+    """Return k document snippets, or [] if no id yet (see query_topics)."""
+    return query_topics(startup_id, [question], k)[question]
+
+
+def query_topics(startup_id: str | None, topics: list, k: int = 4) -> dict:
+    """
+    k snippets per topic as {topic: [snippets]}, fusing BM25 and vector
+    rankings; the vector side is one batched query (every topic embedded in
+    one call) for just the topics BM25 can't answer alone. Empty lists if no
+    id yet. If the vector query fails, RetrievalError carries the BM25-only
+    results, so callers can use them without mistaking them for complete; if
+    the store can't be opened at all, it carries empty lists.
+    """
+    from core.lexical_index import confident, fuse
+
+    topics = list(dict.fromkeys(topics))
+    if not startup_id or not topics:  # ← guard against None/empty
+        return {topic: [] for topic in topics}
+    try:
+        store = get_store()
+    except Exception as e:  # e.g. the embedded store is held by another process
+        print(f"Vector store unavailable: {e}")
+        raise RetrievalError(
+            f"Vector store unavailable: {e}", {topic: [] for topic in topics}
+        ) from e
+    depth = 2 * k
+
+    lexical = {topic: [] for topic in topics}
+    if store.lexical is not None:
+        for topic in topics:
+            try:
+                lexical[topic] = store.lexical.search(startup_id, topic, depth)
+            except sqlite3.Error as e:
+                print(f"Lexical query failed: {e}")
+    semantic = [t for t in topics if not confident(t, lexical[t], k)]
+
+    vector, error = {}, None
+    if semantic:
+        try:
+            res = store.collection.query(
+                query_texts=semantic,
+                n_results=depth,
+                where={"sid": startup_id},
+            )
+            for topic, ids, docs in zip(semantic, res["ids"], res["documents"]):
+                vector[topic] = list(zip(ids, docs))
+        except Exception as e:  # e.g. embedding model unavailable offline
+            print(f"Vector query failed: {e}")
+            error = e
+
+    results = {
+        topic: fuse(
+            [(id_, text) for id_, text, _ in lexical[topic]],
+            vector.get(topic, []),
+            k=k,
+        )
+        for topic in topics
+    }
+    if error is not None:
+        raise RetrievalError(f"Vector query failed: {error}", results) from error
+    return results
@@ -0,0 +1,182 @@
+"""
+Background event loop and shared aiohttp session for web context fetches.
+
+Every web search and page load for hybrid contexts – from sync chains,
+async chains and API requests alike – runs on one daemon event loop with
+one pooled aiohttp session, so connections (and in-flight duplicates, see
+core.singleflight) are shared across the whole process. Sync callers block
+on run(); async callers await arun() without tying the session to their
+own loop.
+
+within() collects results as they complete and gives up on the rest at a
+deadline, so a slow site costs at most the deadline rather than adding to
+every context.
+
+read_html() streams a response body and stops at WEB_PAGE_MAX_KB, or as
+soon as the caller has seen enough; non-HTML responses are skipped without
+reading the body.
+"""
+
+import asyncio
+import atexit
+import codecs
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional
+
+import aiohttp
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Whole-context web budget (searches plus page loads), and per page
+WEB_DEADLINE = float(os.getenv("WEB_CONTEXT_DEADLINE_S", 6))
+PAGE_TIMEOUT = float(os.getenv("WEB_PAGE_TIMEOUT_S", 5))
+
+# Most of a page we download, and the size of each read
+PAGE_MAX_BYTES = int(os.getenv("WEB_PAGE_MAX_KB", 256)) * 1024
+READ_CHUNK = 16 * 1024
+
+HTML_TYPES = {"text/html", "application/xhtml+xml"}
+
+# Connection pool size, overall and per host
+WEB_CONNECTIONS = int(os.getenv("WEB_CONNECTIONS", 32))
+WEB_CONNECTIONS_PER_HOST = 4
+
+
+class _Worker:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="web-fetch", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        async def close():
+            if self.session is not None:
+                await self.session.close()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+_worker: Optional[_Worker] = None
+_worker_lock = threading.Lock()
+
+
+def _get_worker() -> _Worker:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = _Worker()
+        return _worker
+
+
+def get_session() -> aiohttp.ClientSession:
+    """The shared session; only valid on the fetch loop (inside run/arun)."""
+    worker = _get_worker()
+    if asyncio.get_running_loop() is not worker.loop:
+        raise RuntimeError("get_session() must be called on the web fetch loop")
+    if worker.session is None or worker.session.closed:
+        worker.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=WEB_CONNECTIONS,
+                limit_per_host=WEB_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=300,
+            ),
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=PAGE_TIMEOUT),
+        )
+    return worker.session
+
+
+def submit(coro: Coroutine) -> Future:
+    return asyncio.run_coroutine_threadsafe(coro, _get_worker().loop)
+
+
+def run(coro: Coroutine) -> Any:
+    """Run `coro` on the fetch loop and wait for it (sync callers)."""
+    return submit(coro).result()
+
+
+async def arun(coro: Coroutine) -> Any:
+    """Run `coro` on the fetch loop; cancelling the caller cancels it."""
+    return await asyncio.wrap_future(submit(coro))
+
+
+async def within(deadline: float, aws: List[Awaitable]) -> List[Any]:
+    """
+    Results of `aws` in order, as far as they finished by `deadline` (a
+    loop.time() value); late or failed ones are None and the late ones are
+    cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    index = {task: i for i, task in enumerate(tasks)}
+    results: List[Any] = [None] * len(tasks)
+    pending = set(tasks)
+    try:
+        while pending and (remaining := deadline - loop.time()) > 0:
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is not None:
+                    print(f"Web fetch failed: {task.exception()}")
+                else:
+                    results[index[task]] = task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    return results
+
+
+async def read_html(
+    resp: aiohttp.ClientResponse,
+    until: Optional[Callable[[str], bool]] = None,
+    max_bytes: Optional[int] = None,
+) -> str:
+    """
+    The decoded body of an HTML response, at most max_bytes (PAGE_MAX_BYTES)
+    of it. Each decoded chunk is passed to `until` as it arrives and reading
+    stops once that returns True. Non-HTML responses give "".
+    """
+    max_bytes = PAGE_MAX_BYTES if max_bytes is None else max_bytes
+    if "Content-Type" in resp.headers and resp.content_type not in HTML_TYPES:
+        print(f"Skipping {resp.url}: {resp.content_type}")
+        return ""
+    try:
+        decoder = codecs.getincrementaldecoder(resp.charset or "utf-8")("replace")
+    except LookupError:  # unknown charset label
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    parts: List[str] = []
+    read = 0
+    async for chunk in resp.content.iter_chunked(READ_CHUNK):
+        chunk = chunk[: max_bytes - read]
+        read += len(chunk)
+        parts.append(decoder.decode(chunk))  # a cut-off character is dropped
+        if read >= max_bytes or (until is not None and until(parts[-1])):
+            break
+    else:
+        parts.append(decoder.decode(b"", final=True))
+        if until is not None:
+            until(parts[-1])
+    return "".join(parts)
+
+
+def shutdown_web() -> None:
+    """Close the shared session and stop the fetch loop (it restarts on use)."""
+    global _worker
+    with _worker_lock:
+        if _worker is not None:
+            _worker.stop()
+            _worker = None
+
+
+atexit.register(shutdown_web)
@@ -1,15 +1,42 @@
+import argparse
+import asyncio
+import glob
+import json
+import math
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from hashlib import sha1
+from pathlib import Path
+from typing import List, Sequence
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from memo_api.routes import upload, memo, health, pdf_memo
-from chains.pitch_deck_chain import run_pitch_deck_chain
+from chains.pitch_deck_chain import run_pitch_deck_chain, arun_pitch_deck_chain
 from chains.technical_dd_chain import run_technical_dd_chain
 from chains.founder_profiling_chain import run_founder_profiling_chain
 from chains.market_sizing_chain import run_market_sizing_chain
 from chains.financial_analysis_chain import run_financial_analysis_chain
 from chains.competitive_intel_chain import run_competitive_intel_chain
 from chains.risk_assessment_chain import run_risk_assessment_chain
+from chains import (
+    pitch_deck_chain,
+    technical_dd_chain,
+    founder_profiling_chain,
+    market_sizing_chain,
+    financial_analysis_chain,
+    competitive_intel_chain,
+    risk_assessment_chain,
+    fused_extraction_chain,
+)
+from core.checkpoint import DeckCheckpoint
+from core.ingest import ingest_pdf
+from core.pdf_extract import shutdown_pool
+from core.pipeline import ALL_FIELDS, Stage, run_pipeline, arun_pipeline
+from core.retrieval import run_retrieval
+from core.vector_store import close_store, warm_up
+from core.web_fetch import shutdown_web
 from core.schemas import StartupProfile
 from fpdf import FPDF
 
@@ -24,18 +51,176 @@ app.include_router(memo.router, prefix="/api")
 app.include_router(health.router, prefix="/api")
 app.include_router(pdf_memo.router, prefix="/api")
 
+# The PDF extraction pool, the vector store and the web fetch session live
+# across requests; release them with the app
+app.router.add_event_handler("shutdown", shutdown_pool)
+app.router.add_event_handler("shutdown", close_store)
+app.router.add_event_handler("shutdown", shutdown_web)
+
+
+# Every retrieval topic of a run, fetched from the vector store in one query
+RUN_TOPICS = fused_extraction_chain.TOPICS
+
+# VECTOR_STORE_WARM_UP=1 opens the store and loads the embedding model as a
+# worker starts, instead of on its first request
+if os.getenv("VECTOR_STORE_WARM_UP", "").lower() in ("1", "true", "yes"):
+    app.router.add_event_handler("startup", lambda: warm_up(RUN_TOPICS))
+
+
+def index_deck(profile: StartupProfile, pdf_path: str) -> StartupProfile:
+    """Chunk the deck into the vector store so the chains can retrieve from it."""
+    if profile.startup_id:
+        try:
+            ingest_pdf(profile.startup_id, pdf_path)
+        except Exception as e:  # retrieval then just comes back empty
+            print(f"Deck indexing failed: {e}")
+    return profile
+
 
 def run_all_sequential(pdf_path: str) -> StartupProfile:
-    profile = run_pitch_deck_chain(pdf_path)
-    profile = run_technical_dd_chain(profile)
-    profile = run_founder_profiling_chain(profile)
-    profile = run_market_sizing_chain(profile)
-    profile = run_financial_analysis_chain(profile)
-    profile = run_competitive_intel_chain(profile)
-    profile = run_risk_assessment_chain(profile)
+    with run_retrieval(RUN_TOPICS):
+        profile = index_deck(run_pitch_deck_chain(pdf_path), pdf_path)
+        profile = run_technical_dd_chain(profile)
+        profile = run_founder_profiling_chain(profile)
+        profile = run_market_sizing_chain(profile)
+        profile = run_financial_analysis_chain(profile)
+        profile = run_competitive_intel_chain(profile)
+        profile = run_risk_assessment_chain(profile)
     return profile
 
 
+# Analysis stages that run after the pitch-deck chain. Dependencies come from
+# each chain's READS/WRITES, so only risk assessment waits for the others.
+ANALYSIS_STAGES = [
+    Stage(
+        "technical_dd",
+        run_technical_dd_chain,
+        technical_dd_chain.READS,
+        technical_dd_chain.WRITES,
+        technical_dd_chain.arun_technical_dd_chain,
+        technical_dd_chain.PROMPT_VERSION,
+    ),
+    Stage(
+        "founder_profiling",
+        run_founder_profiling_chain,
+        founder_profiling_chain.READS,
+        founder_profiling_chain.WRITES,
+        founder_profiling_chain.arun_founder_profiling_chain,
+        founder_profiling_chain.PROMPT_VERSION,
+    ),
+    Stage(
+        "market_sizing",
+        run_market_sizing_chain,
+        market_sizing_chain.READS,
+        market_sizing_chain.WRITES,
+        market_sizing_chain.arun_market_sizing_chain,
+        market_sizing_chain.PROMPT_VERSION,
+    ),
+    Stage(
+        "financial_analysis",
+        run_financial_analysis_chain,
+        financial_analysis_chain.READS,
+        financial_analysis_chain.WRITES,
+        financial_analysis_chain.arun_financial_analysis_chain,
+        financial_analysis_chain.PROMPT_VERSION,
+    ),
+    Stage(
+        "competitive_intel",
+        run_competitive_intel_chain,
+        competitive_intel_chain.READS,
+        competitive_intel_chain.WRITES,
+        competitive_intel_chain.arun_competitive_intel_chain,
+        competitive_intel_chain.PROMPT_VERSION,
+    ),
+    Stage(
+        "risk_assessment",
+        run_risk_assessment_chain,
+        risk_assessment_chain.READS,
+        risk_assessment_chain.WRITES,
+        risk_assessment_chain.arun_risk_assessment_chain,
+        risk_assessment_chain.PROMPT_VERSION,
+    ),
+]
+
+# --mode fused: one structured call stands in for the five extraction chains
+FUSED_STAGES = [
+    Stage(
+        "fused_extraction",
+        fused_extraction_chain.run_fused_extraction_chain,
+        fused_extraction_chain.READS,
+        fused_extraction_chain.WRITES,
+        fused_extraction_chain.arun_fused_extraction_chain,
+        fused_extraction_chain.PROMPT_VERSION,
+    ),
+    ANALYSIS_STAGES[-1],
+]
+
+MODES = {"chains": ANALYSIS_STAGES, "fused": FUSED_STAGES}
+
+
+def deck_stages(pdf_path: str, mode: str = "chains") -> List[Stage]:
+    """The pitch-deck stage for `pdf_path` followed by the `mode` stages."""
+
+    def _settle_id(profile: StartupProfile) -> StartupProfile:
+        # Parallel stages don't write startup_id back, so settle it up front
+        if not profile.startup_id:
+            profile.startup_id = sha1((profile.name or pdf_path).encode()).hexdigest()[
+                :10
+            ]
+        return profile
+
+    def pitch_deck(_profile: StartupProfile) -> StartupProfile:
+        return index_deck(_settle_id(run_pitch_deck_chain(pdf_path)), pdf_path)
+
+    async def apitch_deck(_profile: StartupProfile) -> StartupProfile:
+        profile = _settle_id(await arun_pitch_deck_chain(pdf_path))
+        return await asyncio.to_thread(index_deck, profile, pdf_path)
+
+    pitch_stage = Stage(
+        "pitch_deck",
+        pitch_deck,
+        (),
+        ALL_FIELDS,
+        apitch_deck,
+        pitch_deck_chain.PROMPT_VERSION,
+    )
+    return [pitch_stage, *MODES[mode]]
+
+
+def run_all(
+    pdf_path: str,
+    resume: bool = False,
+    force_stages: Sequence[str] = (),
+    mode: str = "chains",
+) -> StartupProfile:
+    """
+    Like run_all_sequential, but independent chains run concurrently. With
+    `resume`, stage outputs are checkpointed by deck hash and reused on the
+    next run; `force_stages` are re-run regardless (along with their
+    dependents). mode="fused" swaps the five extraction chains for a single
+    fused call (see chains.fused_extraction_chain).
+    """
+    checkpoint = DeckCheckpoint.for_pdf(pdf_path, force_stages) if resume else None
+    with run_retrieval(RUN_TOPICS):
+        return run_pipeline(
+            StartupProfile(), deck_stages(pdf_path, mode), checkpoint=checkpoint
+        )
+
+
+async def arun_all(
+    pdf_path: str,
+    resume: bool = False,
+    force_stages: Sequence[str] = (),
+    mode: str = "chains",
+) -> StartupProfile:
+    """Awaitable run_all, for driving many decks from one event loop."""
+    checkpoint = DeckCheckpoint.for_pdf(pdf_path, force_stages) if resume else None
+    with run_retrieval(RUN_TOPICS):
+        return await arun_pipeline(
+            StartupProfile(), deck_stages(pdf_path, mode), checkpoint=checkpoint
+        )
+
+
 def format_memo(profile: StartupProfile) -> str:
     """Format the investment memo with improved data handling."""
     # Format market info
@@ -189,17 +374,159 @@ def save_memo_as_pdf(text: str, output_path: str):
     pdf.output(output_path)
 
 
+def expand_deck_paths(args: List[str]) -> List[str]:
+    """Turn CLI arguments (files, directories, globs) into a sorted PDF list."""
+    paths = []
+    for arg in args:
+        if os.path.isdir(arg):
+            paths.extend(glob.glob(os.path.join(arg, "*.pdf")))
+        elif glob.has_magic(arg):
+            paths.extend(glob.glob(arg))
+        else:
+            paths.append(arg)
+    return sorted(set(paths))
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; good enough for a run summary."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def process_deck(pdf_path: str, output_dir: str, **run_kwargs) -> dict:
+    """Analyse one deck and write its memo PDF. Never raises."""
+    start = time.perf_counter()
+    record = {"pdf": pdf_path}
+    try:
+        profile = run_all(pdf_path, **run_kwargs)
+        record["profile"] = profile.model_dump(mode="json")
+        # startup_id is per company, so two decks of one company would share
+        # a memo; name it after the deck (its path hash keeps same-named
+        # decks from different directories apart)
+        deck_hash = sha1(os.path.abspath(pdf_path).encode()).hexdigest()[:8]
+        memo_path = os.path.join(output_dir, f"{Path(pdf_path).stem}-{deck_hash}.pdf")
+        save_memo_as_pdf(format_memo(profile), memo_path)
+        record["memo"] = memo_path
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(
+    pdf_paths: List[str],
+    workers: int,
+    output_dir: str,
+    jsonl_path: str,
+    **run_kwargs,
+) -> List[dict]:
+    """
+    Fan decks out over a bounded thread pool. One JSON line is written per
+    deck as soon as it finishes ("-" streams to stdout), and a throughput
+    summary goes to stderr at the end.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    records = []
+    start = time.perf_counter()
+    out = sys.stdout if jsonl_path == "-" else open(jsonl_path, "w", encoding="utf-8")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(process_deck, p, output_dir, **run_kwargs)
+                for p in pdf_paths
+            ]
+            for future in as_completed(futures):
+                record = future.result()
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                records.append(record)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    ok = [r["seconds"] for r in records if "error" not in r]
+    failed = len(records) - len(ok)
+    summary = f"{len(ok)}/{len(records)} decks ok, {failed} failed in {elapsed:.1f}s"
+    if ok:
+        summary += (
+            f" | {len(ok) / elapsed * 60:.2f} decks/min"
+            f" | p50 {_percentile(ok, 50):.1f}s p95 {_percentile(ok, 95):.1f}s"
+        )
+    print(summary, file=sys.stderr)
+    return records
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate investment memos from pitch-deck PDFs."
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="PDF files, directories or globs (e.g. 'data/*.pdf')"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="decks analysed in parallel (batch)"
+    )
+    parser.add_argument("--out-dir", default="out", help="where memo PDFs go")
+    parser.add_argument(
+        "--jsonl",
+        default=None,
+        help="batch output file, one StartupProfile per line ('-' for stdout; "
+        "default <out-dir>/profiles.jsonl)",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="don't reuse or write stage checkpoints",
+    )
+    parser.add_argument(
+        "--force-stage",
+        action="append",
+        default=[],
+        choices=sorted(
+            {"pitch_deck"}
+            | {stage.name for stages in MODES.values() for stage in stages}
+        ),
+        metavar="STAGE",
+        help="re-run this stage (and its dependents) even if checkpointed; "
+        "repeatable",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=sorted(MODES),
+        default="chains",
+        help="'chains' runs one LLM call per analysis chain; 'fused' extracts "
+        "them in a single call, falling back per chain on missing fields",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python main.py <path_to_pdf>")
+    args = _parse_args(sys.argv[1:])
+    pdf_paths = expand_deck_paths(args.paths)
+    if not pdf_paths:
+        print("No PDF files matched.")
         sys.exit(1)
 
-    pdf_path = sys.argv[1]
-    profile = run_all_sequential(pdf_path)
+    run_kwargs = {
+        "resume": not args.no_resume,
+        "force_stages": args.force_stage,
+        "mode": args.mode,
+    }
+    if len(pdf_paths) > 1 or os.path.isdir(args.paths[0]):
+        jsonl_path = args.jsonl or os.path.join(args.out_dir, "profiles.jsonl")
+        records = run_batch(
+            pdf_paths, args.workers, args.out_dir, jsonl_path, **run_kwargs
+        )
+        sys.exit(1 if any("error" in r for r in records) else 0)
+
+    pdf_path = pdf_paths[0]
+    profile = run_all(pdf_path, **run_kwargs)
     memo_text = format_memo(profile)
     print(memo_text)
 
-    output_dir = "out"
+    output_dir = args.out_dir
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, "memo.pdf")
     save_memo_as_pdf(memo_text, output_path)
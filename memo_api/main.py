@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from memo_api.routes import upload, memo, health
+from core.pdf_extract import shutdown_pool
 
 app = FastAPI(title="VC Memo API")
 
@@ -7,3 +8,6 @@ app.include_router(upload.router, prefix="/api")
 app.include_router(memo.router, prefix="/api")
 app.include_router(health.router, prefix="/api")
 # app.include_router(pdf_memo.router, prefix="/api")
+
+# The PDF extraction pool lives across requests; release it with the app
+app.router.add_event_handler("shutdown", shutdown_pool)
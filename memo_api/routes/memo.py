@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Body
 import uuid
-from memo_api.services.truncate import truncate_to_chars
+from memo_api.services.truncate import truncate_to_tokens
 
 from memo_api.services import (
     market_summary,
@@ -20,8 +20,10 @@ async def memo_endpoint(payload: dict = Body(...)):
     # 2) Grab the full text that came from /upload
     raw_text = payload["extractedText"]
 
-    # 3) Truncate it to, e.g., 8000 characters
-    truncated_text = truncate_to_chars(raw_text, max_chars=8000)
+    # 3) Pack it into the summarizer's token budget
+    truncated_text = truncate_to_tokens(
+        raw_text, max_tokens=2000, model=market_summary.llm.model_name
+    )
 
     # 4) Summarize the truncated chunk
     opportunity = await market_summary.summarize(truncated_text, trace_id)
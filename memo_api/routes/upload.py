@@ -1,11 +1,10 @@
 from fastapi import APIRouter, UploadFile, File, Form
 from typing import List
+import asyncio
 import uuid
 import os
-import tempfile
-import shutil
 
-from memo_api.services import ocr
+from memo_api.services import ocr, uploads
 
 router = APIRouter()
 
@@ -22,18 +21,30 @@ async def upload(
     linkedInUrls: List[str] = Form(default=[]),
 ):
     trace_id = str(uuid.uuid4())
-    workdir = tempfile.mkdtemp(prefix="memo_")
 
-    # 1 save files
-    saved = []
-    for up in documents + ocrDocuments:
-        dest = os.path.join(workdir, up.filename)
-        with open(dest, "wb") as f:
-            shutil.copyfileobj(up.file, f)
-        saved.append(dest)
+    async with uploads.workdir() as workdir:
+        # 1 stream each file to disk; PDFs start extracting as soon as they land
+        extractions = {}  # sha256 -> task, so duplicate files are parsed once
+        budget = uploads.MAX_TOTAL_BYTES
+        try:
+            for i, up in enumerate(documents + ocrDocuments):
+                name = os.path.basename(up.filename or "") or "upload"
+                dest = os.path.join(workdir, f"{i}_{name}")
+                saved = await uploads.save_upload(up, dest, budget)
+                budget -= saved.size
+                if dest.lower().endswith(".pdf") and saved.sha256 not in extractions:
+                    extractions[saved.sha256] = asyncio.create_task(
+                        ocr.process_pdf(dest)
+                    )
 
-    # 2 OCR scanned PDFs
-    ocr_text = await ocr.process_pdfs([p for p in saved if p.lower().endswith(".pdf")])
+            # 2 gather the text, in upload order
+            ocr_text = "".join(await asyncio.gather(*extractions.values()))
+        except BaseException:
+            for task in extractions.values():
+                task.cancel()
+            # Let them unwind before workdir() deletes the files they read
+            await asyncio.gather(*extractions.values(), return_exceptions=True)
+            raise
 
     return {
         "traceId": trace_id,
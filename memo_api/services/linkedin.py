@@ -2,6 +2,8 @@ import os
 import asyncio
 import aiohttp
 
+from core.replay import ReplayMiss, areplayed
+
 BASE = "https://nubela.co/proxycurl/api/v2/linkedin"
 HEAD = {"Authorization": f"Bearer {os.getenv('PROXYCURL_API_KEY', '')}"}
 
@@ -11,10 +13,18 @@ async def fetch(session, url):
         return {}
     if not (url.startswith("http://") or url.startswith("https://")):
         url = f"https://www.linkedin.com/in/{url}"
-    async with session.get(
-        BASE, params={"url": url, "use_cache": "if-present"}, headers=HEAD
-    ) as r:
-        return await r.json()
+
+    async def get():
+        async with session.get(
+            BASE, params={"url": url, "use_cache": "if-present"}, headers=HEAD
+        ) as r:
+            return await r.json()
+
+    try:
+        return await areplayed("proxycurl", {"url": url}, get)
+    except ReplayMiss as e:
+        print(f"[{e}]")
+        return {}
 
 
 async def batch_fetch(urls, trace_id):
@@ -1,22 +1,23 @@
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from core.llm_utils import acached_invoke, get_chat_model
 
 # Load .env at import time so OPENAI_API_KEY is set
 load_dotenv()
 
-client = OpenAI()
+# No explicit temperature, as before (the API default)
+llm = get_chat_model("gpt-3.5-turbo", None)
 
 PROMPT = """You are a market research expert…
 (<<< same prompt text you saw in Flybridge index.js >>>)"""
 
 
 async def summarize(text: str, trace_id: str) -> str:
-    # We remove headers=… since the OpenAI client doesn't accept that parameter.
-    r = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": PROMPT},
-            {"role": "user", "content": f"Company description:\n{text}"},
+    resp = await acached_invoke(
+        llm,
+        [
+            ("system", PROMPT),
+            ("human", f"Company description:\n{text}"),
         ],
     )
-    return r.choices[0].message.content.strip()
+    return resp.content.strip()
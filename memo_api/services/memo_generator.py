@@ -1,7 +1,11 @@
 # memo_api/services/memo_generator.py
-from openai import OpenAI
+from core.llm_utils import acached_invoke, get_chat_model
+from memo_api.services.truncate import truncate_to_tokens
 
-CLIENT = OpenAI()
+LLM = get_chat_model("o1-mini", None)
+
+# Token budget for the deck text quoted in the memo prompt
+EXTRACTED_TEXT_TOKENS = 1000
 
 HTML_PROMPT = """
 <h2>Generated using Flybridge Memo Generator</h2>
@@ -34,14 +38,13 @@ async def generate(opportunity, analysis, founders, meta, trace_id):
         valuationDate=meta.get("valuationDate", ""),
         market_analysis=analysis.get("market_analysis", ""),
         competitor_analysis=analysis.get("competitor_analysis", ""),
-        extractedText=meta.get("extractedText", "")[:4000],  # truncated
+        extractedText=truncate_to_tokens(
+            meta.get("extractedText", ""), EXTRACTED_TEXT_TOKENS, LLM.model_name
+        ),
         founder_block=founders,
     )
 
     # Send exactly one user‐role message containing all instructions + data
-    resp = CLIENT.chat.completions.create(
-        model="o1-mini",
-        messages=[{"role": "user", "content": filled}],
-    )
+    resp = await acached_invoke(LLM, [("human", filled)])
 
-    return resp.choices[0].message.content
+    return resp.content
@@ -1,36 +1,27 @@
-import os
-from google.cloud import vision, storage
-import pdfplumber
-
-# ─── Change here: load credentials from your JSON key ───
-CREDS_PATH = os.path.join(os.getcwd(), "cloud-credentials.json")
-client = vision.ImageAnnotatorClient.from_service_account_file(CREDS_PATH)
-gcs = storage.Client.from_service_account_json(CREDS_PATH)
-
-# The GCS bucket you created (or will create) for OCR
-BUCKET = os.getenv("GCS_OCR_BUCKET", "investment_memo")
-BATCH = 100
+from core.pdf_extract import aiter_pages
 
 
 async def process_pdfs(paths):
     """
     Given a list of local PDF file paths, extract text using pdfplumber
-    and return the concatenated text.
+    (pages in parallel, see core.pdf_extract) and return the concatenated
+    text. Scanned, image-only pages go to the OCR_BACKEND (see core.ocr).
     """
     if not paths:
         return ""
 
-    full_text = ""
+    return "".join([await process_pdf(pdf_path) for pdf_path in paths])
 
-    for pdf_path in paths:
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        full_text += text + "\n\n"
-        except Exception as e:
-            print(f"Error processing {pdf_path}: {str(e)}")
-            continue
 
-    return full_text
+async def process_pdf(pdf_path):
+    """Text of one PDF, pages separated by blank lines ("" if it can't be read)."""
+    parts = []
+    try:
+        async for page in aiter_pages(pdf_path):
+            if page.error:
+                print(f"Error on page {page.page_no} of {pdf_path}: {page.error}")
+            elif page.text:
+                parts.append(page.text + "\n\n")
+    except Exception as e:
+        print(f"Error processing {pdf_path}: {str(e)}")
+    return "".join(parts)
@@ -1,3 +1,6 @@
+from core.context_packer import pack_context
+
+
 def truncate_to_chars(text: str, max_chars: int = 8000) -> str:
     """
     If text is longer than max_chars, cut it off at max_chars.
@@ -5,3 +8,14 @@ def truncate_to_chars(text: str, max_chars: int = 8000) -> str:
     if len(text) <= max_chars:
         return text
     return text[:max_chars]
+
+
+def truncate_to_tokens(
+    text: str, max_tokens: int = 2000, model: str = "gpt-3.5-turbo"
+) -> str:
+    """
+    Keep the text's paragraphs in order, minus repeated ones, up to
+    max_tokens tokens of `model`; the first one that overflows is cut short.
+    """
+    paragraphs = text.split("\n\n")
+    return pack_context(paragraphs, max_tokens, model, keep_order=True)
@@ -0,0 +1,87 @@
+"""
+Streaming storage for /api/upload.
+
+Each UploadFile is copied to the request's workdir in UPLOAD_CHUNK_KB
+chunks; reads, writes and hashing all run off the event loop, so a large
+data-room upload never stalls other requests. The sha256 is computed as
+the bytes stream past and handed to core.text_cache, so a deck that was
+parsed before is served from the cache without being read again.
+
+UPLOAD_MAX_FILE_MB bounds a single file and UPLOAD_MAX_TOTAL_MB a whole
+request; either limit answers 413.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from fastapi import HTTPException, UploadFile
+
+from core.text_cache import remember_hash
+
+UPLOAD_CHUNK = int(os.getenv("UPLOAD_CHUNK_KB", 1024)) * 1024
+MAX_FILE_BYTES = int(float(os.getenv("UPLOAD_MAX_FILE_MB", 50)) * 1024**2)
+MAX_TOTAL_BYTES = int(float(os.getenv("UPLOAD_MAX_TOTAL_MB", 200)) * 1024**2)
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    sha256: str
+    size: int
+
+
+def _check_size(name: str, size: int, budget: int) -> None:
+    if size > MAX_FILE_BYTES:
+        mb = MAX_FILE_BYTES / 1024**2
+        raise HTTPException(413, f"{name} is larger than {mb:g} MB")
+    if size > budget:
+        mb = MAX_TOTAL_BYTES / 1024**2
+        raise HTTPException(413, f"Upload is larger than {mb:g} MB in total")
+
+
+def _write(f, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    f.write(chunk)
+
+
+async def save_upload(
+    up: UploadFile, dest: str, budget: int = MAX_TOTAL_BYTES
+) -> SavedUpload:
+    """
+    Stream `up` to `dest`, hashing as it goes. `budget` is what is left of
+    the request's total allowance; exceeding it or MAX_FILE_BYTES raises 413
+    and removes the partial file.
+    """
+    name = up.filename or "upload"
+    if up.size is not None:  # known up front: fail before copying anything
+        _check_size(name, up.size, budget)
+
+    digest, size = hashlib.sha256(), 0
+    f = await asyncio.to_thread(open, dest, "wb")
+    try:
+        while chunk := await up.read(UPLOAD_CHUNK):
+            size += len(chunk)
+            _check_size(name, size, budget)
+            await asyncio.to_thread(_write, f, digest, chunk)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(os.remove, dest)
+        raise
+    await asyncio.to_thread(f.close)
+    remember_hash(dest, digest.hexdigest())
+    return SavedUpload(dest, digest.hexdigest(), size)
+
+
+@asynccontextmanager
+async def workdir(prefix: str = "memo_"):
+    """A temp directory for one request, removed (off the loop) afterwards."""
+    path = await asyncio.to_thread(tempfile.mkdtemp, prefix=prefix)
+    try:
+        yield path
+    finally:
+        await asyncio.to_thread(shutil.rmtree, path, True)
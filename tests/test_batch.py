@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from core.schemas import StartupProfile
+
+try:
+    import main
+except OSError as e:  # weasyprint (memo API) without its system libraries
+    pytest.skip(f"main.py can't be imported here: {e}", allow_module_level=True)
+
+
+def test_batch_writes_one_record_and_memo_per_deck(monkeypatch, tmp_path):
+    decks = tmp_path / "decks"
+    (decks / "q1").mkdir(parents=True)
+    (decks / "q2").mkdir()
+    for path in (decks / "q1" / "acme.pdf", decks / "q2" / "acme.pdf"):
+        path.write_bytes(b"%PDF-1.4")
+    (decks / "broken.pdf").write_bytes(b"%PDF-1.4")
+    (decks / "notes.txt").write_text("not a deck")
+
+    def run_all(pdf_path, **kwargs):
+        if "broken" in pdf_path:
+            raise ValueError("Failed to extract content from PDF")
+        # Both acme decks are the same company, so they share a startup_id
+        return StartupProfile(startup_id="acme1", name="Acme")
+
+    monkeypatch.setattr(main, "run_all", run_all)
+    monkeypatch.setattr(main, "format_memo", lambda profile: f"Memo for {profile.name}")
+
+    paths = main.expand_deck_paths([str(decks), str(decks / "q*" / "*.pdf")])
+    assert [p.split("decks/")[1] for p in paths] == [
+        "broken.pdf",
+        "q1/acme.pdf",
+        "q2/acme.pdf",
+    ]
+
+    out, jsonl = tmp_path / "out", tmp_path / "out" / "profiles.jsonl"
+    main.run_batch(paths, 2, str(out), str(jsonl))
+
+    records = {
+        r["pdf"].split("decks/")[1]: r
+        for r in map(json.loads, jsonl.read_text().splitlines())
+    }
+    assert set(records) == {"broken.pdf", "q1/acme.pdf", "q2/acme.pdf"}
+    assert records["broken.pdf"]["error"] == (
+        "ValueError: Failed to extract content from PDF"
+    )
+    assert "memo" not in records["broken.pdf"]
+
+    memos = [records[d]["memo"] for d in ("q1/acme.pdf", "q2/acme.pdf")]
+    assert memos[0] != memos[1]
+    assert sorted(p.name for p in out.glob("*.pdf")) == sorted(
+        p.split("/")[-1] for p in memos
+    )
+    assert all(
+        records[d]["profile"]["name"] == "Acme" for d in records if d != "broken.pdf"
+    )
@@ -0,0 +1,57 @@
+from core.checkpoint import CheckpointStore, DeckCheckpoint
+from core.pipeline import ALL_FIELDS, Stage, run_pipeline
+from core.schemas import Competitor, StartupProfile
+
+CALLS = []
+
+
+def _stage(name, field, value, reads=("name",)):
+    def fn(profile):
+        CALLS.append(name)
+        setattr(profile, field, value)
+        return profile
+
+    return Stage(name, fn, reads, (field,), version="v1")
+
+
+def _risk(profile):
+    CALLS.append("risk")
+    profile.risk_score = 0.5 if profile.top_competitors else 0.9
+    return profile
+
+
+STAGES = [
+    _stage("deck", "name", "Iota", reads=()),
+    _stage("market", "TAM", 10.0),
+    _stage("comp", "top_competitors", [Competitor(name="RivalCo")]),
+    Stage("risk", _risk, ALL_FIELDS, ("risk_score",), version="v1"),
+]
+
+
+def test_rerun_restores_from_checkpoint(tmp_path):
+    store = CheckpointStore(str(tmp_path / "ckpt.sqlite"))
+    CALLS.clear()
+    first = run_pipeline(
+        StartupProfile(), STAGES, checkpoint=DeckCheckpoint(store, "abc")
+    )
+    assert sorted(CALLS) == ["comp", "deck", "market", "risk"]
+
+    CALLS.clear()
+    second = run_pipeline(
+        StartupProfile(), STAGES, checkpoint=DeckCheckpoint(store, "abc")
+    )
+    assert CALLS == []
+    assert second == first
+    assert second.top_competitors[0].name == "RivalCo"
+
+
+def test_force_stage_reruns_it_and_dependents(tmp_path):
+    store = CheckpointStore(str(tmp_path / "ckpt.sqlite"))
+    run_pipeline(StartupProfile(), STAGES, checkpoint=DeckCheckpoint(store, "abc"))
+
+    CALLS.clear()
+    ckpt = DeckCheckpoint(store, "abc", force_stages=["market"])
+    prof = run_pipeline(StartupProfile(), STAGES, checkpoint=ckpt)
+    assert sorted(CALLS) == ["market", "risk"]
+    assert prof.name == "Iota"
+    assert prof.risk_score == 0.5
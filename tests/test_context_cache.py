@@ -0,0 +1,84 @@
+import asyncio
+
+import core.hybrid_context
+from core import context_cache, ingest
+from core.context_cache import ContextCache
+from core.schemas import StartupProfile
+from core.vector_store import RetrievalError
+
+
+def _stub_sources(monkeypatch, tmp_path):
+    cache = ContextCache(tmp_path / "contexts.sqlite")
+    monkeypatch.setattr(context_cache, "_cache", cache)
+    monkeypatch.delenv("CONTEXT_CACHE_DISABLED", raising=False)
+    calls = []
+
+    def local(sid, topic, k=3):
+        calls.append(topic)
+        return [f"{topic} from the deck"]
+
+    async def asearch(query, num_results=3):
+        calls.append("web")
+        return []
+
+    monkeypatch.setattr(core.hybrid_context, "local_snippets", local)
+    monkeypatch.setattr(
+        core.hybrid_context,
+        "google_search",
+        lambda q, num_results=3: calls.append("web") or [],
+    )
+    monkeypatch.setattr(core.hybrid_context, "agoogle_search", asearch)
+    return cache, calls
+
+
+def test_context_is_memoised_until_ingest(monkeypatch, tmp_path):
+    cache, calls = _stub_sources(monkeypatch, tmp_path)
+    profile = StartupProfile(startup_id="c1", name="Acme")
+
+    first = core.hybrid_context.get_hybrid_context(profile, "market")
+    assert core.hybrid_context.get_hybrid_context(profile, "market") == first
+    assert asyncio.run(core.hybrid_context.aget_hybrid_context(profile, "market"))
+    assert calls == ["market", "web"]
+
+    # Another process (empty memory tier) reads it from disk
+    monkeypatch.setattr(context_cache, "_cache", ContextCache(cache.path))
+    core.hybrid_context.get_hybrid_context(profile, "market")
+    assert len(calls) == 2
+
+    # New chunks for the startup retire its contexts
+    monkeypatch.setattr("core.vector_store.get_ids", lambda sid, source=None: set())
+    monkeypatch.setattr("core.vector_store.upsert", lambda *a: None)
+    ingest.ingest_text("c1", "Fresh slide", "deck.pdf")
+    core.hybrid_context.get_hybrid_context(profile, "market")
+    assert calls[2:] == ["market", "web"]
+
+
+def test_expired_contexts_are_rebuilt(tmp_path):
+    cache = ContextCache(tmp_path / "contexts.sqlite", ttl=0)
+    key = cache.key("c2", topics=["team"])
+    cache.put(key, "c2", "stale")
+    assert cache.get(key) is None
+
+
+def test_failed_lookups_are_not_memoised(monkeypatch, tmp_path):
+    cache, calls = _stub_sources(monkeypatch, tmp_path)
+    profile = StartupProfile(startup_id="c3", name="Acme")
+
+    def broken_store(sid, topic, k=3):
+        calls.append(topic)
+        raise RetrievalError("Vector query failed", {topic: ["bm25 hit"]})
+
+    monkeypatch.setattr(core.hybrid_context, "local_snippets", broken_store)
+    assert "bm25 hit" in core.hybrid_context.get_hybrid_context(profile, "market")
+    core.hybrid_context.get_hybrid_context(profile, "market")
+    assert calls == ["market", "web", "market", "web"]
+
+    # Search failures (None) are not memoised either
+    monkeypatch.setattr(
+        core.hybrid_context, "local_snippets", lambda sid, topic, k=3: ["deck"]
+    )
+    monkeypatch.setattr(
+        core.hybrid_context, "google_search", lambda q, num_results=3: None
+    )
+    core.hybrid_context.get_hybrid_context(profile, "team")
+    assert cache.stats()["contexts"] == 0
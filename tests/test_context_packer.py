@@ -0,0 +1,44 @@
+from core.context_packer import ContextPacker, pack_context, rank_by_position
+from core.tokens import count_tokens
+
+FILLER = "the quick brown fox jumps over the lazy dog near the river bank "
+
+
+def test_stays_within_budget():
+    snippets = [FILLER * 40, FILLER.upper() * 40, "short note"]
+    packed = pack_context(snippets, 200)
+    assert count_tokens(packed) <= 200
+    assert packed.startswith("the quick brown fox")
+
+
+def test_drops_near_duplicates():
+    a = FILLER * 5
+    packed = pack_context([a, a + " (copy)", "ARR grew 3x last year"], 1000)
+    assert packed == a.strip() + "\n\nARR grew 3x last year"
+
+
+def test_ranks_by_score_and_can_keep_order():
+    snippets = ["page one", "page two", "page three"]
+    scores = [0.1, 0.9, 0.5]
+    assert pack_context(snippets, 1000, scores=scores).split("\n\n") == [
+        "page two",
+        "page three",
+        "page one",
+    ]
+    assert (
+        pack_context(snippets, 1000, scores=scores, keep_order=True).split("\n\n")
+        == snippets
+    )
+
+
+def test_rank_by_position_interleaves_sources():
+    assert rank_by_position(["l1", "l2"], ["w1"]) == [1.0, 0.5, 1.0]
+
+
+def test_packer_reports_when_full():
+    packer = ContextPacker(60)
+    assert packer.add("first page " * 10)
+    assert not packer.add("second page " * 40)  # cut to fit, then full
+    assert not packer.add("third page")
+    assert count_tokens(packer.text()) <= 60
+    assert "third" not in packer.text()
@@ -0,0 +1,51 @@
+import chromadb
+import numpy as np
+
+from core import embeddings
+from core.embeddings import CachedEmbeddingFunction, EmbeddingCache
+
+
+def _counting_backend(monkeypatch):
+    seen = []
+
+    def factory(model):
+        def embed(texts):
+            seen.append(list(texts))
+            return embeddings.hash_embed(texts)
+
+        return embed
+
+    monkeypatch.setitem(embeddings.BACKENDS, "counting", (factory, "count-1"))
+    return seen
+
+
+def test_only_misses_are_embedded(monkeypatch, tmp_path):
+    seen = _counting_backend(monkeypatch)
+    embed = CachedEmbeddingFunction("counting", cache=EmbeddingCache(tmp_path / "e"))
+
+    first = embed(["funding OR revenue", "team", "team"])
+    assert seen == [["funding OR revenue", "team"]]
+    second = embed(["team", "market size", "funding OR revenue"])
+    assert seen[-1] == ["market size"]
+    assert np.allclose(second[0], first[1]) and np.allclose(second[2], first[0])
+
+    # Persistent: a new process (fresh memory tier) still hits the disk cache
+    again = CachedEmbeddingFunction("counting", cache=EmbeddingCache(tmp_path / "e"))
+    again(["team", "market size"])
+    assert len(seen) == 2
+    assert again.cache.stats()["vectors"] == 3
+
+
+def test_hash_backend_retrieves_offline(tmp_path):
+    embed = CachedEmbeddingFunction("hash", cache=EmbeddingCache(tmp_path / "e"))
+    collection = chromadb.EphemeralClient().get_or_create_collection(
+        embeddings.collection_name("docs", embed),
+        metadata={"hnsw:space": "cosine"},
+        embedding_function=embed,
+    )
+    collection.upsert(
+        ids=["a", "b"],
+        documents=["Revenue grew while burn fell", "Founders previously at Google"],
+    )
+    res = collection.query(query_texts=["revenue and burn"], n_results=1)
+    assert res["documents"][0] == ["Revenue grew while burn fell"]
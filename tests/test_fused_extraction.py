@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import pytest
+from langchain.schema import AIMessage
+from langchain_openai import ChatOpenAI
+
+import core.hybrid_context
+import core.vector_store
+from chains.fused_extraction_chain import (
+    arun_fused_extraction_chain,
+    run_fused_extraction_chain,
+)
+from core.schemas import StartupProfile
+
+FUSED = {
+    "tech_maturity": "beta",
+    "moat_strength": "proprietary dataset",
+    "founder_fit_score": 0.8,
+    "prior_exits": 1,
+    "TAM": 1000,
+    "SAM": 200,
+    "SOM": 20,
+    "cash_burn_12m": 3,
+    "runway_months": 18,
+    "implied_valuation": 40,
+    "top_competitors": [{"name": "Acme", "differentiator": "cheaper"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def _stub_retrieval(monkeypatch):
+    monkeypatch.setattr(core.vector_store, "query_doc", lambda sid, q, k=3: [q])
+    monkeypatch.setattr(
+        core.vector_store, "query_topics", lambda sid, qs, k=3: {q: [q] for q in qs}
+    )
+    monkeypatch.setattr(core.hybrid_context, "google_search", lambda q, **kw: [])
+
+    async def no_results(query, **kw):
+        return []
+
+    monkeypatch.setattr(core.hybrid_context, "agoogle_search", no_results)
+
+
+def _stub_llm(monkeypatch, fused_answer):
+    """Answer the fused prompt with `fused_answer`, per-chain prompts by kind."""
+    prompts = []
+
+    def answer(prompt):
+        text = str(prompt)
+        prompts.append(text)
+        if "ONE JSON object with exactly these keys" in text:
+            return AIMessage(content=json.dumps(fused_answer))
+        if "market-research analyst" in text:
+            return AIMessage(content='{"TAM": 5, "SAM": 4, "SOM": 3}')
+        return AIMessage(content="{}")
+
+    monkeypatch.setattr(ChatOpenAI, "invoke", lambda self, p: answer(p))
+
+    async def fake_ainvoke(self, prompt):
+        return answer(prompt)
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", fake_ainvoke)
+    return prompts
+
+
+def test_complete_answer_takes_one_call(monkeypatch):
+    prompts = _stub_llm(monkeypatch, FUSED)
+    prof = run_fused_extraction_chain(StartupProfile(startup_id="f1", name="Zeta"))
+
+    assert len(prompts) == 1
+    assert prof.tech_maturity == "beta"
+    assert prof.prior_exits == 1
+    assert (prof.TAM, prof.SAM, prof.SOM) == (1000, 200, 20)
+    assert prof.top_competitors[0].name == "Acme"
+
+
+def test_missing_group_falls_back_to_its_chain(monkeypatch):
+    partial = {k: v for k, v in FUSED.items() if k != "SOM"}
+    prompts = _stub_llm(monkeypatch, partial)
+    prof = asyncio.run(
+        arun_fused_extraction_chain(StartupProfile(startup_id="f2", name="Eta"))
+    )
+
+    assert len(prompts) == 2  # fused call + market-sizing fallback
+    assert (prof.TAM, prof.SAM, prof.SOM) == (5, 4, 3)
+    assert prof.runway_months == 18
+
+
+def test_null_numbers_fall_back_instead_of_defaulting(monkeypatch):
+    prompts = _stub_llm(monkeypatch, {**FUSED, "TAM": None})
+    prof = run_fused_extraction_chain(StartupProfile(startup_id="f3", name="Iota"))
+
+    assert "Use null for any value" in prompts[0]
+    assert len(prompts) == 2
+    assert (prof.TAM, prof.SAM, prof.SOM) == (5, 4, 3)
@@ -0,0 +1,20 @@
+from core.html_text import TextExtractor, html_to_text
+
+
+def test_visible_text_only():
+    html = (
+        "<html><head><title>Acme</title><style>p {}</style></head><body>"
+        "<script>var x = '<p>no</p>';</script><p>Hello &amp; welcome</p>"
+        "<svg><text>logo</text></svg><noscript>enable js</noscript><p>Bye</p>"
+        "</body></html>"
+    )
+    assert html_to_text(html, 100).split("\n") == ["Acme", "Hello & welcome", "Bye"]
+
+
+def test_stops_once_enough_text_is_collected():
+    extractor = TextExtractor(20)
+    assert not extractor.feed("<p>" + "a" * 10)
+    assert extractor.feed("a" * 10 + "</p>")
+    assert extractor.feed("<p>" + "b" * 1000 + "</p>")  # not parsed
+    assert extractor.consumed == len("<p>" + "a" * 20 + "</p>")
+    assert extractor.text() == "a" * 20
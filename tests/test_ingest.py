@@ -0,0 +1,65 @@
+import core.vector_store
+from core import ingest
+
+
+class FakeStore:
+    def __init__(self):
+        self.docs = {}
+        self.batches = []
+
+    def get_ids(self, sid, source=None):
+        return {
+            id_
+            for id_, (_, meta) in self.docs.items()
+            if meta["sid"] == sid and source in (None, meta["source"])
+        }
+
+    def delete_ids(self, ids):
+        for id_ in ids:
+            del self.docs[id_]
+
+    def upsert(self, ids, documents, metadatas):
+        self.batches.append(len(ids))
+        self.docs.update(zip(ids, zip(documents, metadatas)))
+
+
+def _fake_store(monkeypatch):
+    store = FakeStore()
+    for name in ("get_ids", "delete_ids", "upsert"):
+        monkeypatch.setattr(core.vector_store, name, getattr(store, name))
+    return store
+
+
+def test_chunk_page_splits_at_headings():
+    text = "\n".join(
+        ["PROBLEM", "word " * 40, "SOLUTION", "word " * 40, "Traction:", "word " * 40]
+    )
+    chunks = ingest.chunk_page(text, max_tokens=60)
+    assert [c.splitlines()[0] for c in chunks] == ["PROBLEM", "SOLUTION", "Traction:"]
+    assert ingest.chunk_page("short slide", max_tokens=60) == ["short slide"]
+
+
+def test_ingest_is_idempotent_and_batched(monkeypatch):
+    store = _fake_store(monkeypatch)
+    monkeypatch.setattr(ingest, "INGEST_BATCH", 2)
+    deck = ingest.PAGE_BREAK.join(f"Slide {i} text" for i in range(5))
+
+    assert ingest.ingest_text("acme", deck, "deck.pdf") == 5
+    assert store.batches == [2, 2, 1]
+    assert sorted(meta["page"] for _, meta in store.docs.values()) == [1, 2, 3, 4, 5]
+
+    assert ingest.ingest_text("acme", deck, "deck.pdf") == 0
+    assert len(store.docs) == 5
+
+    edited = deck.replace("Slide 4 text", "Slide 4 revised")
+    assert ingest.ingest_text("acme", edited, "deck.pdf") == 1
+    texts = sorted(doc for doc, _ in store.docs.values())
+    assert len(texts) == 5 and "Slide 4 revised" in texts
+
+
+def test_ingest_pdf_keeps_page_numbers(monkeypatch):
+    store = _fake_store(monkeypatch)
+    assert ingest.ingest_pdf("airbnb", "data/airbnb.pdf") > 0
+    pages = {meta["page"] for _, meta in store.docs.values()}
+    assert pages <= set(range(1, 15)) and len(pages) > 1
+    assert {meta["source"] for _, meta in store.docs.values()} == {"airbnb.pdf"}
@@ -0,0 +1,108 @@
+import chromadb
+import pytest
+
+from core import lexical_index, vector_store
+from core.lexical_index import LexicalIndex, confident, fuse
+
+CHUNKS = {
+    "a": "Founder and CEO Jane Doe, previously at Stripe; see LinkedIn.",
+    "b": "Our CEO and founder built two companies; crunchbase lists both exits.",
+    "c": "Revenue grew 3x while monthly burn fell to $200k.",
+}
+
+
+def _index(tmp_path):
+    index = LexicalIndex(tmp_path / "lexical.sqlite")
+    index.upsert(
+        list(CHUNKS),
+        list(CHUNKS.values()),
+        [{"sid": "s1", "source": "deck.pdf"}] * len(CHUNKS),
+    )
+    return index
+
+
+def test_bm25_search_and_confidence(tmp_path):
+    index = _index(tmp_path)
+    topic = "founder OR CEO OR linkedin OR crunchbase"
+    hits = index.search("s1", topic, 5)
+    assert [id_ for id_, _, _ in hits] == ["a", "b"]
+    assert confident(topic, hits, 2) and not confident(topic, hits, 3)
+    assert not confident("revenue OR valuation", index.search("s1", "revenue", 5), 1)
+    assert index.search("other", topic, 5) == []
+
+    index.delete(["a"])
+    assert index.ids("s1") == {"b", "c"}
+
+
+def test_fuse_prefers_agreement():
+    lexical = [("a", "A"), ("b", "B")]
+    vector = [("c", "C"), ("b", "B")]
+    assert fuse(lexical, vector, k=2) == ["B", "A"]
+
+
+def test_confident_topics_skip_the_vector_query(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store, "_store", None)
+    monkeypatch.setattr(vector_store, "CHROMA_DB_DIR", str(tmp_path / "db"))
+    monkeypatch.setattr(lexical_index, "LEXICAL_MIN_TERMS", 2)
+    store = vector_store.get_store()
+    vector_store.upsert(
+        list(CHUNKS),
+        list(CHUNKS.values()),
+        [{"sid": "s1", "source": "deck.pdf"}] * len(CHUNKS),
+    )
+    assert vector_store.get_ids("s1", "deck.pdf") == set(CHUNKS)
+
+    queried = []
+    real_query = store.collection.query
+    monkeypatch.setattr(
+        store.collection,
+        "query",
+        lambda query_texts, **kw: queried.append(query_texts)
+        or real_query(query_texts=query_texts, **kw),
+    )
+    founder, finance = "founder OR CEO OR linkedin", "revenue OR burn"
+    results = vector_store.query_topics("s1", [founder, finance], k=2)
+    assert queried == [[finance]]  # only the uncertain topic was embedded
+    assert sorted(results[founder]) == sorted([CHUNKS["a"], CHUNKS["b"]])
+    assert results[finance][0] == CHUNKS["c"]
+    vector_store.close_store()
+
+
+def test_server_mode_without_a_shared_index_is_vector_only(monkeypatch, tmp_path):
+    monkeypatch.delenv("LEXICAL_INDEX_PATH", raising=False)
+    monkeypatch.setattr(vector_store, "CHROMA_DB_DIR", str(tmp_path / "db"))
+    monkeypatch.setattr(chromadb, "HttpClient", lambda **kw: chromadb.EphemeralClient())
+    store = vector_store.VectorStore(server_url="http://chroma.test:8000")
+    monkeypatch.setattr(vector_store, "_store", store)
+    assert store.lexical is None
+
+    vector_store.upsert(
+        list(CHUNKS),
+        list(CHUNKS.values()),
+        [{"sid": "s1", "source": "deck.pdf"}] * len(CHUNKS),
+    )
+    assert vector_store.get_ids("s1", "deck.pdf") == set(CHUNKS)
+    founder = "founder OR CEO OR linkedin"
+    assert len(vector_store.query_topics("s1", [founder], k=2)[founder]) == 2
+    assert not (tmp_path / "db").exists()  # no per-host BM25 file
+    vector_store.close_store()
+
+
+def test_failed_vector_query_reports_the_bm25_results(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store, "_store", None)
+    monkeypatch.setattr(vector_store, "CHROMA_DB_DIR", str(tmp_path / "db"))
+    store = vector_store.get_store()
+    vector_store.upsert(
+        list(CHUNKS),
+        list(CHUNKS.values()),
+        [{"sid": "s1", "source": "deck.pdf"}] * len(CHUNKS),
+    )
+
+    def offline(**kw):
+        raise OSError("embedding model unavailable")
+
+    monkeypatch.setattr(store.collection, "query", offline)
+    with pytest.raises(vector_store.RetrievalError) as failed:
+        vector_store.query_topics("s1", ["revenue growth"], k=1)
+    assert failed.value.results == {"revenue growth": [CHUNKS["c"]]}
+    vector_store.close_store()
@@ -0,0 +1,61 @@
+import time
+
+from langchain_openai import ChatOpenAI
+from langchain.schema import AIMessage
+import pytest
+
+from core import llm_utils
+from core.llm_utils import LLMCache, cached_invoke, cache_key
+
+CALLS = []
+
+
+@pytest.fixture(autouse=True)
+def _stub_llm(monkeypatch, tmp_path):
+    def fake_invoke(self, prompt):
+        CALLS.append(prompt)
+        return AIMessage(content='{"TAM": 1}')
+
+    monkeypatch.setattr(ChatOpenAI, "invoke", fake_invoke, raising=True)
+    monkeypatch.setattr(llm_utils, "_cache", LLMCache(str(tmp_path / "llm.sqlite")))
+    CALLS.clear()
+
+
+def test_second_call_is_served_from_cache():
+    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2)
+
+    first = cached_invoke(llm, "size the market", bypass=False)
+    second = cached_invoke(llm, "size the market", bypass=False)
+
+    assert first.content == second.content == '{"TAM": 1}'
+    assert len(CALLS) == 1
+    assert llm_utils.get_cache().stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_key_depends_on_model_and_temperature():
+    msgs = [{"role": "human", "content": "hi"}]
+    assert cache_key("gpt-4", 0.2, msgs) != cache_key("gpt-4", 0.7, msgs)
+    assert cache_key("gpt-4", 0.2, msgs) != cache_key("gpt-3.5-turbo", 0.2, msgs)
+
+
+def test_bypass_always_calls_llm():
+    llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2)
+    cached_invoke(llm, "size the market", bypass=True)
+    cached_invoke(llm, "size the market", bypass=True)
+    assert len(CALLS) == 2
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    cache = LLMCache(str(tmp_path / "small.sqlite"), ttl=60, max_entries=2)
+    cache.put("a", "m", "A")
+    time.sleep(0.01)
+    cache.put("b", "m", "B")
+    time.sleep(0.01)
+    assert cache.get("a") == "A"  # "a" is now more recent than "b"
+    cache.put("c", "m", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get("c") is None
@@ -0,0 +1,33 @@
+import asyncio
+
+import httpx
+
+from core.llm_utils import _PerLoopAsyncClient, get_chat_model
+
+
+def test_registry_reuses_clients_and_pool():
+    a = get_chat_model("gpt-3.5-turbo", 0.2)
+    b = get_chat_model("gpt-3.5-turbo", 0.2)
+    c = get_chat_model("gpt-4", 0.2)
+
+    assert a is b
+    assert a is not c
+    # Different models still share one keep-alive pool
+    assert a.client._client._client is c.client._client._client
+    assert a.async_client._client._client is c.async_client._client._client
+
+
+def test_async_pool_per_event_loop():
+    client = _PerLoopAsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200))
+    )
+
+    async def call():
+        resp = await client.get("https://api.test/v1/models")
+        return resp.status_code, client.pool()
+
+    status, first = asyncio.run(call())
+    status_again, second = asyncio.run(call())  # a fresh loop, as per deck
+    assert status == status_again == 200
+    assert first is not second
+    assert len(client._pools) == 1  # the closed loop's pool was dropped
@@ -0,0 +1,40 @@
+import pdfplumber.page
+
+from core import ocr, pdf_extract
+
+DECK = "data/airbnb.pdf"
+
+
+def test_image_only_pages_are_ocred_in_batches(monkeypatch):
+    backend = ocr.StubBackend("scanned text")
+    monkeypatch.setattr(pdf_extract, "get_ocr_backend", lambda: backend)
+    monkeypatch.setattr(pdf_extract, "OCR_BATCH", 3)
+    monkeypatch.setattr(pdf_extract, "OCR_DPI", 20)
+    # Pretend the deck was scanned: no page has a text layer
+    monkeypatch.setattr(pdfplumber.page.Page, "extract_text", lambda self: "")
+
+    pages = pdf_extract.extract_pages(DECK)
+
+    with pdfplumber.open(DECK) as pdf:
+        has_images = [bool(page.images) for page in pdf.pages]
+    assert [p.page_no for p in pages] == list(range(1, len(has_images) + 1))
+    assert [p.ocr for p in pages] == has_images
+    assert all(p.text == ("scanned text" if p.ocr else "") for p in pages)
+    assert all(p.image is None for p in pages)
+    n = sum(has_images)
+    assert backend.calls == [3] * (n // 3) + ([n % 3] if n % 3 else [])
+
+
+def test_text_pages_skip_ocr(monkeypatch):
+    backend = ocr.StubBackend("scanned text")
+    monkeypatch.setattr(pdf_extract, "get_ocr_backend", lambda: backend)
+    pages = pdf_extract.extract_pages(DECK)
+    assert backend.calls == [] and not any(p.ocr for p in pages)
+
+
+def test_unavailable_backend_disables_ocr(monkeypatch):
+    monkeypatch.setenv("OCR_BACKEND", "no-such-engine")
+    monkeypatch.setattr(ocr, "_backends", {})
+    assert ocr.get_ocr_backend() is None
+    monkeypatch.setenv("OCR_BACKEND", "stub")
+    assert isinstance(ocr.get_ocr_backend(), ocr.StubBackend)
@@ -0,0 +1,60 @@
+import asyncio
+
+from core import pdf_extract
+
+DECK = "data/airbnb.pdf"
+
+
+def test_parallel_matches_serial(monkeypatch):
+    serial = pdf_extract.extract_range(DECK, 0, pdf_extract.page_count(DECK))
+
+    monkeypatch.setattr(pdf_extract, "EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(pdf_extract, "MIN_PARALLEL_PAGES", 1)
+    monkeypatch.setattr(pdf_extract, "PAGES_PER_TASK", 3)
+    try:
+        parallel = pdf_extract.extract_pages(DECK)
+        async_parallel = asyncio.run(pdf_extract.aextract_pages(DECK))
+    finally:
+        pdf_extract.shutdown_pool()
+
+    assert [p.page_no for p in parallel] == list(range(1, len(serial) + 1))
+    assert parallel == serial == async_parallel
+
+
+def test_page_errors_are_isolated(monkeypatch):
+    import pdfplumber.page
+
+    real = pdfplumber.page.Page.extract_text
+
+    def flaky(self, *args, **kwargs):
+        if self.page_number == 2:
+            raise ValueError("bad content stream")
+        return real(self, *args, **kwargs)
+
+    monkeypatch.setattr(pdfplumber.page.Page, "extract_text", flaky)
+    pages = pdf_extract.extract_pages(DECK)
+    assert pages[1].error == "ValueError: bad content stream"
+    assert pages[1].text == ""
+    assert pages[0].text and pages[2].text
+
+
+def test_iter_pages_streams_documents_in_order():
+    pages = pdf_extract.iter_pages([DECK, "data/sample_deck.pdf"])
+    first = next(pages)
+    assert (first.doc, first.page_no) == (DECK, 1)
+    rest = list(pages)
+    assert [p.page_no for p in rest if p.doc == DECK] == list(range(2, 15))
+    assert rest[-1].doc == "data/sample_deck.pdf"
+
+
+def test_stopping_early_leaves_the_pool_usable(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(pdf_extract, "MIN_PARALLEL_PAGES", 1)
+    monkeypatch.setattr(pdf_extract, "PAGES_PER_TASK", 2)
+    try:
+        pages = pdf_extract.iter_pages(DECK)
+        assert next(pages).page_no == 1
+        pages.close()
+        assert len(pdf_extract.extract_pages(DECK)) == 14
+    finally:
+        pdf_extract.shutdown_pool()
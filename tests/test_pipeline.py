@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from core.schemas import StartupProfile
+from core.pipeline import (
+    ALL_FIELDS,
+    Stage,
+    arun_pipeline,
+    run_pipeline,
+    stage_dependencies,
+)
+
+
+def _slow_writer(field, value, delay=0.2):
+    def fn(profile):
+        time.sleep(delay)
+        setattr(profile, field, value)
+        return profile
+
+    return fn
+
+
+def _risk(profile):
+    # Sees every upstream write because it waits on all of them
+    profile.risk_score = float(profile.TAM + profile.runway_months)
+    return profile
+
+
+STAGES = [
+    Stage("market", _slow_writer("TAM", 100.0), ("name",), ("TAM",)),
+    Stage(
+        "finance", _slow_writer("runway_months", 12.0), ("name",), ("runway_months",)
+    ),
+    Stage("tech", _slow_writer("tech_maturity", "beta"), ("name",), ("tech_maturity",)),
+    Stage("risk", _risk, ALL_FIELDS, ("risk_score",)),
+]
+
+
+def test_stage_dependencies():
+    deps = stage_dependencies(STAGES)
+    assert deps["market"] == deps["finance"] == deps["tech"] == set()
+    assert deps["risk"] == {"market", "finance", "tech"}
+
+
+def test_run_pipeline_parallel_and_merged():
+    prof = StartupProfile(startup_id="pipe1", name="Zeta")
+
+    start = time.perf_counter()
+    prof = run_pipeline(prof, STAGES)
+    elapsed = time.perf_counter() - start
+
+    # Three 0.2 s stages in parallel, not 0.6 s back to back
+    assert elapsed < 0.5
+    assert prof.TAM == 100.0
+    assert prof.runway_months == 12.0
+    assert prof.tech_maturity == "beta"
+    assert prof.risk_score == 112.0
+
+
+def test_arun_pipeline_mixes_sync_and_async_stages():
+    async def _async_tam(profile):
+        await asyncio.sleep(0.2)
+        profile.TAM = 100.0
+        return profile
+
+    stages = [
+        Stage("market", None, ("name",), ("TAM",), _async_tam),
+        *STAGES[1:],
+    ]
+    prof = StartupProfile(startup_id="pipe2", name="Eta")
+
+    start = time.perf_counter()
+    prof = asyncio.run(arun_pipeline(prof, stages))
+
+    assert time.perf_counter() - start < 0.5
+    assert prof.risk_score == 112.0
+    assert prof.tech_maturity == "beta"
@@ -0,0 +1,70 @@
+import time
+from types import SimpleNamespace
+
+from chains import pitch_deck_chain
+from core.rate_limit import RateLimiter
+
+LIMITS = {"gpt-test": {"rpm": 60, "tpm": 1000}}
+
+
+def test_budget_is_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "rl.sqlite")
+    a = RateLimiter(path, LIMITS)
+    b = RateLimiter(path, LIMITS)  # stands in for a second worker process
+
+    assert a._try_acquire("gpt-test", 600) == 0
+    # Only ~400 tokens left in the shared bucket; b must wait for a refill
+    wait = b._try_acquire("gpt-test", 600)
+    assert 11 < wait < 13  # 200 tokens at 1000/min
+
+
+def test_requests_per_minute(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.sqlite"), {"m": {"rpm": 2}})
+    assert limiter._try_acquire("m", 10) == 0
+    assert limiter._try_acquire("m", 10) == 0
+    assert limiter._try_acquire("m", 10) > 0
+
+
+def test_unknown_model_is_not_throttled(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.sqlite"), LIMITS)
+    start = time.perf_counter()
+    for _ in range(5):
+        limiter.acquire("other-model", 10**6)
+    assert time.perf_counter() - start < 1
+
+
+def test_settle_refunds_overestimate(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.sqlite"), LIMITS)
+    assert limiter._try_acquire("gpt-test", 900) == 0
+    limiter.settle("gpt-test", estimated=900, actual=100)
+    assert limiter._try_acquire("gpt-test", 800) == 0
+
+
+def test_crew_tasks_draw_from_the_limiter(monkeypatch):
+    calls = []
+
+    class Limiter:
+        def acquire(self, model, tokens):
+            calls.append(("acquire", model))
+
+        def settle(self, model, estimated, actual):
+            calls.append(("settle", actual))
+
+    class Crew:
+        task_callback = None
+        tasks = [
+            SimpleNamespace(agent=SimpleNamespace(backstory="b"), description=d)
+            for d in ("company", "market", "competitors")
+        ]
+
+        def kickoff(self):
+            for _ in self.tasks:
+                calls.append(("task", None))
+                self.task_callback(None)
+            return SimpleNamespace(token_usage=SimpleNamespace(total_tokens=900))
+
+    monkeypatch.setattr(pitch_deck_chain, "get_limiter", lambda: Limiter())
+    pitch_deck_chain._kickoff(Crew())
+    acquire = ("acquire", "gpt-4")
+    task = ("task", None)
+    assert calls == [acquire, task, acquire, task, acquire, task, ("settle", 900)]
@@ -0,0 +1,65 @@
+import httpx
+import pytest
+from langchain_openai import ChatOpenAI
+
+from benchmarks.stub_server import llm_request, serve_in_background
+from core import replay
+
+
+@pytest.fixture(autouse=True)
+def _replay_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPLAY_DIR", str(tmp_path))
+
+
+def test_record_then_replay(monkeypatch):
+    calls = []
+
+    def live():
+        calls.append(1)
+        return ["https://example.com"]
+
+    monkeypatch.setenv("REPLAY_MODE", "record")
+    assert replay.replayed("google", {"query": "acme"}, live) == ["https://example.com"]
+
+    monkeypatch.setenv("REPLAY_MODE", "replay")
+    assert replay.replayed("google", {"query": "acme"}, live) == ["https://example.com"]
+    assert len(calls) == 1
+    with pytest.raises(replay.ReplayMiss):
+        replay.replayed("google", {"query": "other"}, live)
+
+
+def test_stub_server_replays_recorded_completion():
+    messages = [{"role": "user", "content": "hi"}]
+    body = {"model": "gpt-3.5-turbo", "messages": messages, "temperature": 0.2}
+    recorded = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-3.5-turbo",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "recorded answer"},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+    }
+    replay.save("llm", llm_request(body), recorded)
+
+    with serve_in_background() as base_url:
+        llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.2, base_url=base_url)
+        assert llm.invoke("hi").content == "recorded answer"
+        assert llm.invoke("unrecorded").content == "{}"  # synthetic miss
+        stats = httpx.get(base_url.removesuffix("/v1") + "/stats").json()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_stub_server_injects_errors():
+    with serve_in_background(error_rate=1.0, error_status=503) as base_url:
+        resp = httpx.post(
+            f"{base_url}/chat/completions",
+            json={"model": "gpt-4", "messages": []},
+        )
+    assert resp.status_code == 503
+    assert resp.json()["error"]["type"] == "server_error"
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+import core.vector_store
+from core.pipeline import Stage, arun_pipeline, run_pipeline
+from core.retrieval import local_snippets, local_snippets_many, run_retrieval
+from core.schemas import StartupProfile
+from core.vector_store import RetrievalError
+
+TOPICS = ["team", "market", "revenue"]
+
+
+def _stub_store(monkeypatch):
+    calls = []
+
+    def query_topics(sid, topics, k=4):
+        calls.append(list(topics))
+        return {topic: [f"{sid}:{topic}:{i}" for i in range(k)] for topic in topics}
+
+    monkeypatch.setattr(core.vector_store, "query_topics", query_topics)
+    return calls
+
+
+def _stages(seen):
+    def reader(topic):
+        def fn(profile):
+            seen[topic] = local_snippets(profile.startup_id, topic, k=2)
+            return profile
+
+        return Stage(topic, fn)
+
+    return [reader(topic) for topic in TOPICS]
+
+
+def test_one_batched_query_per_run(monkeypatch):
+    calls = _stub_store(monkeypatch)
+    seen = {}
+    with run_retrieval(TOPICS) as run:
+        run_pipeline(StartupProfile(startup_id="s1"), _stages(seen))
+        assert local_snippets_many("s1", TOPICS[:2], 3)[1] == [
+            f"s1:market:{i}" for i in range(3)
+        ]
+    assert calls == [TOPICS] and run.queries == 1
+    assert seen["revenue"] == ["s1:revenue:0", "s1:revenue:1"]
+
+    # Outside a run every lookup goes to the store
+    local_snippets_many("s1", TOPICS, 2)
+    assert len(calls) == 2
+
+
+def test_async_stages_share_the_run(monkeypatch):
+    calls = _stub_store(monkeypatch)
+
+    async def main():
+        seen = {}
+        with run_retrieval(TOPICS):
+            await arun_pipeline(StartupProfile(startup_id="s2"), _stages(seen))
+        return seen
+
+    assert sorted(asyncio.run(main())) == sorted(TOPICS)
+    assert calls == [TOPICS]
+
+
+def test_failed_query_is_not_kept_for_the_run(monkeypatch):
+    calls = []
+
+    def query_topics(sid, topics, k=4):
+        calls.append(list(topics))
+        if len(calls) == 1:
+            raise RetrievalError("Vector query failed", {"team": ["bm25"]})
+        return {topic: [f"{sid}:{topic}"] for topic in topics}
+
+    monkeypatch.setattr(core.vector_store, "query_topics", query_topics)
+    with run_retrieval(TOPICS):
+        with pytest.raises(RetrievalError) as failed:
+            local_snippets("s1", "team")
+        assert failed.value.results == {"team": ["bm25"]}
+        assert local_snippets("s1", "team") == ["s1:team"]
+    assert len(calls) == 2
@@ -1,5 +1,10 @@
+import asyncio
+
 from core.schemas import StartupProfile
-from chains.risk_assessment_chain import run_risk_assessment_chain
+from chains.risk_assessment_chain import (
+    run_risk_assessment_chain,
+    arun_risk_assessment_chain,
+)
 
 from langchain_openai import ChatOpenAI
 from langchain.schema import AIMessage
@@ -19,3 +24,15 @@ def test_risk_assessment():
     prof = run_risk_assessment_chain(prof)
     assert prof.risk_flags == ["single founder"]
     assert prof.risk_score == 0.7
+
+
+def test_arun_risk_assessment(monkeypatch):
+    async def fake_ainvoke(self, prompt):
+        return AIMessage(content='{"risk_flags":["no revenue"],"risk_score":0.4}')
+
+    monkeypatch.setattr(ChatOpenAI, "ainvoke", fake_ainvoke, raising=True)
+
+    prof = StartupProfile(startup_id="risk2", name="Theta")
+    prof = asyncio.run(arun_risk_assessment_chain(prof))
+    assert prof.risk_flags == ["no revenue"]
+    assert prof.risk_score == 0.4
@@ -0,0 +1,59 @@
+import pytest
+
+from core import pdf_extract
+from core.text_cache import TextCache
+
+DECK = "data/uber-pitch-deck.pdf"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = TextCache(tmp_path / "text.sqlite")
+    monkeypatch.setattr(pdf_extract, "get_text_cache", lambda: cache)
+    return cache
+
+
+def _count_parses(monkeypatch):
+    parsed = []
+    real = pdf_extract._extract_doc
+
+    def counting(path, first=0):
+        for page in real(path, first):
+            parsed.append(page.page_no)
+            yield page
+
+    monkeypatch.setattr(pdf_extract, "_extract_doc", counting)
+    return parsed
+
+
+def test_known_deck_is_not_parsed_again(cache, monkeypatch):
+    parsed = _count_parses(monkeypatch)
+    first = pdf_extract.extract_pages(DECK)
+    again = pdf_extract.extract_pages(DECK)
+
+    assert again == first
+    assert parsed == list(range(1, 14))  # only the first read parsed
+    assert cache.hits == 1
+
+
+def test_early_stop_keeps_leading_pages(cache, monkeypatch):
+    parsed = _count_parses(monkeypatch)
+    pages = pdf_extract.iter_pages(DECK)
+    [next(pages) for _ in range(3)]
+    pages.close()
+
+    assert len(pdf_extract.extract_pages(DECK)) == 13
+    assert parsed == [1, 2, 3] + list(range(4, 14))
+    assert cache.get(pdf_extract.doc_hash(DECK), pdf_extract._extractor_key())[1]
+
+
+def test_eviction_is_lru_by_size(tmp_path):
+    cache = TextCache(tmp_path / "text.sqlite", max_bytes=10)
+    cache.put("a", "v1", [(1, "aaaa")])
+    cache.put("b", "v1", [(1, "bbbb")])
+    cache.get("a", "v1")  # a is now the most recently used
+    cache.put("c", "v1", [(1, "cccc")])
+
+    assert cache.get("a", "v1")[1]
+    assert cache.get("b", "v1") == ([], False)
+    assert cache.stats()["docs"] == 2
@@ -0,0 +1,53 @@
+import glob
+import tempfile
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from memo_api.routes import upload
+from memo_api.services import uploads
+
+DECK = "data/sample_deck.pdf"
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(upload.router, prefix="/api")
+    return TestClient(app)
+
+
+def _post(files):
+    return _client().post("/api/upload", data={"email": "a@b.c"}, files=files)
+
+
+def test_upload_extracts_and_cleans_up(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK", 1024)  # several chunks per file
+    deck = Path(DECK).read_bytes()
+    resp = _post(
+        [
+            ("documents", ("deck.pdf", deck, "application/pdf")),
+            ("documents", ("copy.pdf", deck, "application/pdf")),
+            ("ocrDocuments", ("notes.txt", b"not a pdf", "text/plain")),
+        ]
+    )
+    assert resp.status_code == 200
+    text = resp.json()["extractedText"]
+    assert text.strip()
+    assert text.count(text.strip()[:40]) == 1  # the duplicate was parsed once
+    assert glob.glob(str(tmp_path / "memo_*")) == []
+
+
+def test_upload_size_limits(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    deck = ("deck.pdf", Path(DECK).read_bytes(), "application/pdf")
+
+    monkeypatch.setattr(uploads, "MAX_FILE_BYTES", 1000)
+    assert _post([("documents", deck)]).status_code == 413
+
+    monkeypatch.setattr(uploads, "MAX_FILE_BYTES", 10 * len(deck[1]))
+    monkeypatch.setattr(uploads, "MAX_TOTAL_BYTES", len(deck[1]) + 10)
+    assert _post([("documents", deck)]).status_code == 200
+    assert _post([("documents", deck), ("documents", deck)]).status_code == 413
+    assert glob.glob(str(tmp_path / "memo_*")) == []
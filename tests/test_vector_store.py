@@ -0,0 +1,82 @@
+import fcntl
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core import vector_store
+
+
+def test_import_opens_nothing(tmp_path):
+    code = (
+        "import sys, core.vector_store, core.hybrid_context, core.retrieval; "
+        "assert 'chromadb' not in sys.modules"
+    )
+    env = {**os.environ, "CHROMA_DB_DIR": str(tmp_path / "db")}
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
+    assert not (tmp_path / "db").exists()
+
+
+def test_store_opens_lazily_and_reopens(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store, "_store", None)
+    monkeypatch.setattr(vector_store, "CHROMA_DB_DIR", str(tmp_path / "db"))
+    vector_store.add_doc("vs1", "Revenue doubled while burn fell.")
+    assert (tmp_path / "db" / ".owner.lock").exists()
+    vector_store.close_store()
+    assert vector_store._store is None
+
+    # Reopening sees what the earlier handle wrote
+    assert vector_store.query_doc("vs1", "revenue", k=1) == [
+        "Revenue doubled while burn fell."
+    ]
+    vector_store.close_store()
+
+
+def test_embedded_directory_is_single_process(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store, "_store", None)
+    monkeypatch.setattr(vector_store, "CHROMA_DB_DIR", str(tmp_path / "db"))
+    (tmp_path / "db").mkdir()
+    with open(tmp_path / "db" / ".owner.lock", "w") as other_process:
+        fcntl.flock(other_process, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with pytest.raises(RuntimeError, match="CHROMA_SERVER_URL"):
+            vector_store.get_store()
+    # Free again once the other process lets go
+    vector_store.get_store()
+    vector_store.close_store()
+
+
+def test_store_held_elsewhere_degrades_to_web_only(monkeypatch, tmp_path):
+    import core.hybrid_context
+    from core import context_cache
+    from core.context_cache import ContextCache
+    from core.schemas import StartupProfile
+
+    cache = ContextCache(tmp_path / "contexts.sqlite")
+    monkeypatch.setattr(context_cache, "_cache", cache)
+    monkeypatch.delenv("CONTEXT_CACHE_DISABLED", raising=False)
+    monkeypatch.setattr(vector_store, "_store", None)
+    monkeypatch.setattr(vector_store, "CHROMA_DB_DIR", str(tmp_path / "db"))
+    monkeypatch.setattr(core.hybrid_context, "google_search", lambda q, **kw: [])
+    (tmp_path / "db").mkdir()
+    with open(tmp_path / "db" / ".owner.lock", "w") as other_process:
+        fcntl.flock(other_process, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with pytest.raises(vector_store.RetrievalError) as failed:
+            vector_store.query_topics("vs2", ["revenue", "team"])
+        assert failed.value.results == {"revenue": [], "team": []}
+
+        profile = StartupProfile(startup_id="vs2", name="Acme")
+        context = core.hybrid_context.get_hybrid_context(profile, "revenue")
+        assert context == "No local or web info found."
+        assert cache.stats()["contexts"] == 0  # not memoised
+
+
+def test_failed_open_releases_the_directory(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store, "_store", None)
+    monkeypatch.setattr(vector_store, "CHROMA_DB_DIR", str(tmp_path / "db"))
+    monkeypatch.setenv("EMBEDDING_BACKEND", "no-such-backend")
+    with pytest.raises(ValueError):
+        vector_store.get_store()
+    assert (tmp_path / "db").resolve() not in vector_store._claims
+    with open(tmp_path / "db" / ".owner.lock", "w") as other_process:
+        fcntl.flock(other_process, fcntl.LOCK_EX | fcntl.LOCK_NB)
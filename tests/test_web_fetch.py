@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import core.hybrid_context
+from core import web_fetch
+from core.schemas import StartupProfile
+
+
+def test_within_keeps_early_results_and_cancels_late_ones():
+    cancelled = []
+
+    async def answer(value, delay):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(value)
+            raise
+        return value
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def main():
+        deadline = asyncio.get_running_loop().time() + 0.2
+        return await web_fetch.within(
+            deadline, [answer("slow", 5), answer("fast", 0), fail()]
+        )
+
+    start = time.perf_counter()
+    assert web_fetch.run(main()) == [None, "fast", None]
+    assert time.perf_counter() - start < 1
+    assert cancelled == ["slow"]
+
+
+def test_slow_site_costs_at_most_the_deadline(monkeypatch):
+    monkeypatch.setattr(core.hybrid_context, "WEB_DEADLINE", 0.3)
+    monkeypatch.setattr(core.hybrid_context, "local_snippets", lambda *a, **kw: [])
+    urls = ["https://fast.test", "https://slow.test"]
+
+    async def asearch(query, num_results=3):
+        return urls
+
+    monkeypatch.setattr(
+        core.hybrid_context, "google_search", lambda q, num_results=3: urls
+    )
+    monkeypatch.setattr(core.hybrid_context, "agoogle_search", asearch)
+
+    async def fetch(session, url, max_chars=1500):
+        if "slow" in url:
+            await asyncio.sleep(5)
+        return f"text of {url}"
+
+    monkeypatch.setattr(core.hybrid_context, "afetch_page_text", fetch)
+    profile = StartupProfile(startup_id="w1", name="Acme")
+
+    start = time.perf_counter()
+    context = core.hybrid_context.get_hybrid_context(profile, "market")
+    assert time.perf_counter() - start < 2
+    assert "text of https://fast.test" in context
+    assert "slow.test" not in context
+
+    start = time.perf_counter()
+    context = asyncio.run(core.hybrid_context.aget_hybrid_context(profile, "team"))
+    assert time.perf_counter() - start < 2
+    assert "text of https://fast.test" in context
+
+
+class _Response:
+    def __init__(self, body, content_type="text/html; charset=utf-8"):
+        self.url = "https://acme.test"
+        self.headers = {"Content-Type": content_type} if content_type else {}
+        self.content_type = (content_type or "application/octet-stream").split(";")[0]
+        self.charset = "utf-8" if content_type and "charset" in content_type else None
+        self.content = self
+        self.body = body
+        self.reads = 0
+
+    async def iter_chunked(self, n):
+        for i in range(0, len(self.body), n):
+            self.reads += 1
+            yield self.body[i : i + n]
+
+
+def test_read_html_is_capped_and_skips_other_types():
+    async def read(resp, **kw):
+        return await web_fetch.read_html(resp, **kw)
+
+    page = ("<p>" + "é" * 50_000 + "</p>").encode()
+    resp = _Response(page)
+    html = web_fetch.run(read(resp, max_bytes=40_000))
+    assert len(html.encode()) <= 40_000 and resp.reads == 3
+
+    resp = _Response(page)
+    html = web_fetch.run(read(resp, until=lambda text: True))
+    assert resp.reads == 1 and html.startswith("<p>é")
+
+    assert web_fetch.run(read(_Response(page, content_type=None))).endswith("</p>")
+    assert web_fetch.run(read(_Response(b"%PDF-1.7", "application/pdf"))) == ""
+
+
+def test_recorded_page_serves_any_max_chars(monkeypatch, tmp_path):
+    page = ("<p>" + "word " * 20_000 + "</p>").encode()
+
+    class Session:
+        def get(self, url, headers=None):
+            class Request:
+                async def __aenter__(self):
+                    return _Response(page)
+
+                async def __aexit__(self, *exc):
+                    return False
+
+            return Request()
+
+    monkeypatch.setenv("REPLAY_DIR", str(tmp_path))
+    monkeypatch.setenv("REPLAY_MODE", "record")
+    url = "https://acme.test/about"
+    fetch = core.hybrid_context.afetch_page_text
+    assert len(web_fetch.run(fetch(Session(), url, 100))) == 100
+
+    monkeypatch.setenv("REPLAY_MODE", "replay")
+    assert len(web_fetch.run(fetch(None, url, 50_000))) == 50_000